@@ -1,12 +1,29 @@
-import csv
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, has_request_context, jsonify, request, send_from_directory, stream_with_context
 import requests
 import os
 import json
+import threading
+from functools import lru_cache
 from dotenv import load_dotenv
 from flask_cors import CORS 
-import re
-import random
+from catalog import GroceryCatalog
+from price_index import PriceIndex
+from basket import BasketPricer
+from response_cache import ResponseCache, cache_key
+from http_client import http_client
+from single_flight import SingleFlight
+from recipe_details import RecipeDetailBatcher
+from lobby_store import CONSTRAINT_FIELDS, LobbyStore
+from lobby_events import LobbyEvents
+from fridge_store import FridgeStore
+from recipe_index import RecipeIndex, normalize_ingredient
+from ingredients import canonical_ingredients
+from recipe_fanout import IngredientFanout
+from prefetch import Prefetcher
+from image_cache import PIXABAY_URL, ImageResolver
+from metrics import metrics
+from responses import compressor, etag_for, json_body_response
+from quota import QuotaExceeded, QuotaScheduler, background, estimate_cost, seconds_until_reset
 load_dotenv()
  # Import CORS
 
@@ -14,75 +31,209 @@ app = Flask(__name__)
 CORS(app)
 
 API_KEY = os.getenv('API_KEY')
-print(API_KEY)
 PIXABAY_API_KEY = os.getenv('PIXABAY_API_KEY')
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
-FRIDGE_FILE = os.path.join(BASE_DIR, "fridge.txt")
+# Overridable so utils/benchmark.py can point the app at synthetic fixtures and a local upstream
+BASE_DIR = os.path.abspath(os.getenv('BASE_DIR') or os.path.join(os.path.dirname(__file__), "../../"))
+BACKEND_DIR = os.path.abspath(os.getenv('BACKEND_DIR') or os.path.join(os.path.dirname(__file__), ".."))
+SPOONACULAR_URL = os.getenv('SPOONACULAR_URL', 'https://api.spoonacular.com').rstrip('/')
+FRIDGE_FILE = os.path.join(BACKEND_DIR, "fridge.txt")
 RECIPES_FILE = os.path.join(BASE_DIR, "recipes.json")
 LOBBY_DATA_FILE = os.path.join(BASE_DIR, "store/rooms.json")  # Ensure the full path is correct
+LOBBY_DB_FILE = os.path.join(BASE_DIR, "store/lobbies.sqlite3")
+FRIDGE_DB_FILE = os.path.join(BASE_DIR, "store/fridge.sqlite3")
 
 # Ensure the directory exists before writing to the file
 os.makedirs(os.path.dirname(LOBBY_DATA_FILE), exist_ok=True)
-PIXABAY_URL = "https://pixabay.com/api/"
+lobby_store = LobbyStore(LOBBY_DB_FILE, legacy_json_path=LOBBY_DATA_FILE)
+lobby_events = LobbyEvents()
+fridge_store = FridgeStore(FRIDGE_DB_FILE, legacy_csv_path=FRIDGE_FILE)
+SPOONACULAR_CACHE_FILE = os.path.join(BACKEND_DIR, "cache/spoonacular.sqlite3")
+THUMBNAILS_DIR = os.path.join(BACKEND_DIR, "cache/thumbnails")
+THUMBNAILS_URL = "/recipes/fridgeImages"
+# Set to profile every request and keep a cProfile report of those slower than this many milliseconds
+PROFILE_SLOW_REQUESTS_MS = float(os.getenv('PROFILE_SLOW_REQUESTS_MS') or 0)
+PROFILES_DIR = os.path.join(BACKEND_DIR, "cache/profiles")
+# Spoonacular points per day on our plan (150 is the free plan); the answers' quota headers take over once seen
+SPOONACULAR_DAILY_POINTS = float(os.getenv('SPOONACULAR_DAILY_POINTS') or 150)
+# Fridge edits closer together than this trigger a single background recompute of the recommendations
+PREFETCH_DEBOUNCE_SECONDS = float(os.getenv('PREFETCH_DEBOUNCE_SECONDS') or 2)
+
+# A local recipe only stands in for Spoonacular when it uses this many query ingredients
+# and this share of its own ingredients...
+LOCAL_MIN_USED = 2
+LOCAL_MIN_RECIPE_COVERAGE = 0.5
+# ...and the answer as a whole uses this share of the query (else the query is mostly unexplored)
+LOCAL_MIN_QUERY_SHARE = 0.25
+# Local candidates ranked per recipe asked for, so enough survive the coverage filter
+LOCAL_CANDIDATE_FACTOR = 5
+
+# How long each Spoonacular endpoint's answers stay fresh, in seconds
+SPOONACULAR_TTLS = {
+    "findByIngredients": 6 * 60 * 60,
+    "complexSearch": 24 * 60 * 60,
+    "information": 7 * 24 * 60 * 60,
+    "informationBulk": 7 * 24 * 60 * 60,
+}
 
 ingredients__mock_list = ['apple', 'sugar', 'flour']
 
 recipesList = []
 fridge = []
 
+grocery_catalog = GroceryCatalog(BACKEND_DIR)
+price_index = PriceIndex(grocery_catalog)
+basket_pricer = BasketPricer(price_index)
+response_cache = ResponseCache(SPOONACULAR_CACHE_FILE)
+upstream_flight = SingleFlight()
+quota = QuotaScheduler(SPOONACULAR_DAILY_POINTS)
+recipe_index = RecipeIndex(RECIPES_FILE)
+image_resolver = ImageResolver(http_client, PIXABAY_API_KEY, THUMBNAILS_DIR, THUMBNAILS_URL,
+                               search_url=os.getenv('PIXABAY_URL', PIXABAY_URL))
+
+# Per-route timings at /metrics: upstream calls by host, store and file work by operation
+metrics.init_app(app, PROFILE_SLOW_REQUESTS_MS, PROFILES_DIR)
+compressor.init_app(app)
+http_client.observer = metrics.record_upstream
+metrics.instrument(lobby_store, 'lobby_store', ['create_lobby', 'get_lobby', 'get_participants',
+                                                'get_constraints', 'add_participant'])
+metrics.instrument(fridge_store, 'fridge_store', ['items', 'get', 'add', 'set_image', 'delete'])
+metrics.instrument(response_cache, 'response_cache', ['get_body', 'set'])
+metrics.instrument(grocery_catalog, 'catalog', ['snapshot'])
+metrics.instrument(recipe_index, 'recipe_index', ['find_by_ingredients'])
+metrics.instrument(basket_pricer, 'basket_pricing', ['price_recipes'])
+
+
+def spoonacular_get_body(url, params, owner=None):
+    """GET a Spoonacular endpoint and return the body still serialized, from the response cache when possible
+
+    Calls are charged to the daily quota (and to owner, when given); if the budget won't
+    cover one, an expired cached answer is served instead, or QuotaExceeded raised.
+    """
+    key = cache_key(url, params)
+    cached = response_cache.get_body(key)
+    if cached is not None:
+        return cached
+
+    endpoint = url.rstrip('/').split('/')[-1]
+
+    def fetch():
+        with quota.spend(estimate_cost(endpoint, params), owner) as record:
+            response = http_client.get(url, params={**params, 'apiKey': API_KEY})
+            record(response)
+        if response.status_code == 402:
+            raise QuotaExceeded('Spoonacular daily quota used up')
+        response.raise_for_status()
+        with metrics.timed('json_parse'):
+            value = response.json()
+        # Hand back the cached serialization so a fresh answer and later cache hits share one ETag
+        return response_cache.set(key, endpoint, value, SPOONACULAR_TTLS.get(endpoint, 60 * 60))
+
+    # Identical concurrent queries share one upstream call; each caller parses its own copy
+    try:
+        return upstream_flight.do(key, fetch)
+    except QuotaExceeded:
+        stale = response_cache.get_stale_body(key)
+        if stale is None:
+            raise
+        quota_fallback('stale-cache')
+        return stale
+
+
+def spoonacular_get(url, params, owner=None):
+    """GET a Spoonacular endpoint, answering from the response cache when possible"""
+    text = spoonacular_get_body(url, params, owner)
+    with metrics.timed('json_parse'):
+        return json.loads(text)
+
+
+def spoonacular_response(url, params, local_fallback=None):
+    """Pass a Spoonacular answer through unparsed, with an ETag derived from the cached payload
+
+    local_fallback() builds the answer from local data when the quota is exhausted.
+    """
+    try:
+        body = spoonacular_get_body(url, params)
+    except QuotaExceeded as e:
+        if local_fallback is None:
+            return quota_exhausted(e)
+        quota_fallback('local-index')
+        return jsonify(local_fallback())
+    return json_body_response(body, etag_for(body))
+
+
+def quota_fallback(source):
+    """Note that this request was answered from `source` because the quota ran low"""
+    quota.record_fallback()
+    if has_request_context():
+        g.quota_fallback = source
+
+
+def quota_exhausted(e):
+    return jsonify({'error': str(e)}), 503, {'Retry-After': str(seconds_until_reset())}
+
+
+@app.after_request
+def add_quota_fallback_header(response):
+    if 'quota_fallback' in g:
+        response.headers['X-Quota-Fallback'] = g.quota_fallback
+    return response
+
+
+def local_search(query='', number=10):
+    """complexSearch-shaped answer from the recipes we already know"""
+    results = recipe_index.search(query, number)
+    return {'results': results, 'offset': 0, 'number': number, 'totalResults': len(results)}
+
 
 def get_lobby_by_id(lobby_id):
-    if os.path.exists(LOBBY_DATA_FILE):
-        with open(LOBBY_DATA_FILE, 'r') as file:
-            lobbies = json.load(file)
-            lobby = next((lobby for lobby in lobbies if lobby['lobbyId'] == lobby_id), None)
-            if lobby:
-                return lobby
-    return None  
+    return lobby_store.get_lobby(lobby_id)
 
 @app.route('/')
 def home():
     return "Hello, Flask!"
 
 
+def cache_stats_snapshot():
+    return {
+        'response_cache': response_cache.snapshot_stats(),
+        'single_flight': upstream_flight.snapshot_stats(),
+        'recipe_details': recipe_details.snapshot_stats(),
+        'lobby_events': lobby_events.snapshot_stats(),
+        'image_resolver': image_resolver.snapshot_stats(),
+        'compression': compressor.snapshot_stats(),
+        'quota': quota.snapshot_stats(),
+        'prefetch': prefetcher.snapshot_stats(),
+        'ingredient_fanout': ingredient_fanout.snapshot_stats(),
+    }
+
+def cache_gauges():
+    for component, stats in cache_stats_snapshot().items():
+        for stat, value in stats.items():
+            if isinstance(value, (int, float)):
+                yield 'app_cache_stat', {'component': component, 'stat': stat}, value
+
+metrics.describe('app_cache_stat', 'Cache, batching and pub/sub counters and hit ratios, by component')
+metrics.add_collector(cache_gauges)
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify(cache_stats_snapshot())
+
+
 @app.route('/recipes/getRecipesFromIngredients', methods=['GET'])
 def get_recipes_from_ingredients():
     try:
         fridge = load_fridge()
-        iga_discounts = load_grocery_json("iga_results.json")
-        # metro_discounts = load_grocery_json("metro_results.json")
-        # super_discounts = load_grocery_json("super_results.json")
         fridge_names = extract_names(fridge)
-        
-        ingredients = fridge_names + iga_discounts  # + metro_discounts + super_discounts
-        if not ingredients:
-            return jsonify({'error': 'No ingredients provided'}), 400
+        sources = ingredient_sources(fridge_names)
 
-        ingredients_string = ', '.join(ingredient for ingredient in ingredients)
-        
-        url = 'https://api.spoonacular.com/recipes/findByIngredients'
-        params = {
-            'apiKey': API_KEY,
-            'ingredients': ingredients_string,
-            'number': 5,
-            'ranking': 1,
-            'ignorePantry': True
-        }
-        response = requests.get(url, params=params)
-        response.raise_for_status()
+        if not any(sources.values()):
+            return jsonify({'error': 'No ingredients provided'}), 400
 
-        recipes = response.json()
+        recipes = find_recipes_by_ingredients(sources, 5)
 
-        # Add price calculation for each recipe
-        for recipe in recipes:
-            total_price = 0
-            for ingredient in recipe.get("usedIngredients", []) + recipe.get("missedIngredients", []):
-                ingredient_name = ingredient.get("name", "").lower()
-                total_price += get_price(ingredient_name)
-                
-            random_multiplier = random.uniform(1.25, 1.75)
-            recipe["total_price"] = round(total_price, 2)
-            recipe["original_price"] = round(total_price * random_multiplier, 2)
+        # Cheapest basket across IGA, Metro and Super C for everything not already in the fridge
+        recipes = basket_pricer.price_recipes(recipes, owned=fridge_names)
 
         return jsonify(recipes)
 
@@ -94,64 +245,153 @@ def get_recipes_from_ingredients():
 def get_recipes_from_ingredients_recommendations():
     try:
         ingredients = load_fridge()
-        print(ingredients)  # Get ingredients from query params
         if not ingredients:
             return jsonify({'error': 'No ingredients provided'}), 400
 
-        ingredients_string = ', '.join(ingredient['name'] for ingredient in ingredients)
-        
-        url = 'https://api.spoonacular.com/recipes/findByIngredients'
-        params = {
-            'apiKey': API_KEY,
-            'ingredients': ingredients_string,
-            'number':10,
-            'ranking': 1,
-            'ignorePantry': True
-        }
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-
-        save_recipes(response.json())
-        return jsonify(response.json())
+        return jsonify(recommend_from_fridge(extract_names(ingredients)))
     except requests.exceptions.RequestException as e:
         return jsonify({'error': str(e)}), 500
 
+def ingredient_sources(fridge_names):
+    """The fridge plus each store's discounts, as find_recipes_by_ingredients sources"""
+    sources = {'fridge': fridge_names}
+    for store in ('iga', 'metro', 'super c'):
+        # Flyer names carry brands and sizes; only the ingredients they stand for are worth a query
+        sources[store] = list(flyer_ingredients(tuple(load_grocery_json(store))))
+    return sources
+
+def recommend_from_fridge(fridge_names):
+    recipes = find_recipes_by_ingredients({'fridge': fridge_names}, 10)
+
+    # Local answers come from recipes we already know, so only rewrite the file for new ones
+    if any(recipe.get('id') not in get_recipes_by_id() for recipe in recipes):
+        save_recipes(recipes)
+    return recipes
+
+def fetch_recipes_by_ingredients(ingredients, number):
+    url = f'{SPOONACULAR_URL}/recipes/findByIngredients'
+    params = {
+        'ingredients': ', '.join(ingredients),
+        'number': number,
+        'ranking': 1,
+        'ignorePantry': True
+    }
+    recipes = spoonacular_get(url, params)
+    recipe_index.add_recipes(recipes)
+    return recipes
+
+ingredient_fanout = IngredientFanout(fetch_recipes_by_ingredients)
+
+def local_candidates(recipes, ingredients):
+    """The local recipes good enough to answer without Spoonacular (none if they barely touch the query)"""
+    covered = [
+        recipe for recipe in recipes
+        if recipe['usedIngredientCount'] >= LOCAL_MIN_USED
+        and recipe['usedIngredientCount'] >= LOCAL_MIN_RECIPE_COVERAGE * (
+            recipe['usedIngredientCount'] + recipe['missedIngredientCount'])
+    ]
+    query = {normalize_ingredient(name) for name in ingredients if name.strip()}
+    used = {normalize_ingredient(i['name']) for recipe in covered for i in recipe['usedIngredients']}
+    if not query or len(used) < LOCAL_MIN_QUERY_SHARE * len(query):
+        return []
+    return covered
+
+def find_recipes_by_ingredients(sources, number):
+    """Rank recipes from the local index, only asking Spoonacular when it has too few
+
+    sources maps where the ingredients come from ('fridge', a store name) to their names;
+    each source is queried upstream in its own chunks, concurrently.
+    """
+    ingredients = [name for names in sources.values() for name in names]
+    recipes = recipe_index.find_by_ingredients(ingredients, number * LOCAL_CANDIDATE_FACTOR)
+    covered = local_candidates(recipes, ingredients)
+    if len(covered) >= number:
+        return covered[:number]
+    try:
+        return ingredient_fanout.find(sources, number)
+    except QuotaExceeded:
+        # Fewer recipes beat no recipes
+        quota_fallback('local-index')
+        return recipes[:number]
+
 def load_recipes():
     if os.path.exists(RECIPES_FILE):
-        with open(RECIPES_FILE, "r") as f:
+        with metrics.timed('load_recipes'), open(RECIPES_FILE, "r") as f:
             return json.load(f)
     return {"results": []}
 
 def save_recipes(recipes):
+    # Written aside and swapped in: the prefetcher and requests both save, readers never see half a file
+    tmp_file = f"{RECIPES_FILE}.{threading.get_ident()}.tmp"
     try:
-        with open(RECIPES_FILE, "w") as f:
-            json.dump({"results": recipes}, f, indent=4)
+        with metrics.timed('save_recipes'):
+            with open(tmp_file, "w") as f:
+                json.dump({"results": recipes}, f, indent=4)
+            os.replace(tmp_file, RECIPES_FILE)
     except IOError as e:
         print(f"Error saving recipes to {RECIPES_FILE}: {e}")
 
+recipes_by_id = {}
+recipes_mtime = None
+
+def get_recipes_by_id():
+    """Saved recipes keyed by ID, re-read only when recipes.json changes"""
+    global recipes_by_id, recipes_mtime
+    try:
+        mtime = os.stat(RECIPES_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if mtime != recipes_mtime:
+        recipes_by_id = {r.get("id"): r for r in load_recipes().get("results", [])}
+        recipes_mtime = mtime
+    return recipes_by_id
+
+def fetch_recipe_information_bulk(recipe_ids):
+    url = f'{SPOONACULAR_URL}/recipes/informationBulk'
+    details = spoonacular_get(url, {'ids': ','.join(str(recipe_id) for recipe_id in recipe_ids)})
+    recipe_index.add_details(details)
+    return details
+
+recipe_details = RecipeDetailBatcher(fetch_recipe_information_bulk)
+
+
+def warm_recommendations():
+    """Recompute what the recipe pages ask for and pull it, with the recipe details, into the caches"""
+    with background():
+        fridge_names = extract_names(load_fridge())
+        if not fridge_names:
+            return
+        recipes = recommend_from_fridge(fridge_names)
+        recipe_details.warm(recipe['id'] for recipe in recipes if 'id' in recipe)
+        find_recipes_by_ingredients(ingredient_sources(fridge_names), 5)
+
+# Runs after fridge edits settle, and when a new flyer file changes the catalog
+prefetcher = Prefetcher(warm_recommendations, PREFETCH_DEBOUNCE_SECONDS,
+                        watch=lambda: grocery_catalog.version, watch_reason='flyers')
+
+@app.before_request
+def start_prefetcher():
+    # Started by the first request, so only the process that serves (not the reloader's parent) watches flyers
+    prefetcher.start()
+
 
 @app.route('/recipes/getRecipeInformation/<int:recipe_id>', methods=['GET'])
 def get_recipe_information(recipe_id):
-    # Load the recipes from the local file
-    recipes = load_recipes().get("results", [])
-    recipe = next((r for r in recipes if r.get("id") == recipe_id), None)
-    
-    if recipe:
-        try:
-            # If recipe exists, make an API call to get more detailed information
-            url = f'https://api.spoonacular.com/recipes/{recipe_id}/information'
-            params = {
-                'apiKey': API_KEY,
-            }
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            
-            # Return the detailed recipe information
-            return jsonify(response.json())
-        except requests.exceptions.RequestException as e:
-            return jsonify({'error': str(e)}), 500
-    else:
+    if recipe_id not in get_recipes_by_id():
+        return jsonify({"error": "Recipe not found"}), 404
+
+    try:
+        # Lookups arriving together are merged into one informationBulk call
+        recipe_information = recipe_details.get(recipe_id)
+    except QuotaExceeded:
+        quota_fallback('local-index')
+        recipe_information = recipe_index.details(recipe_id)
+    except requests.exceptions.RequestException as e:
+        return jsonify({'error': str(e)}), 500
+
+    if recipe_information is None:
         return jsonify({"error": "Recipe not found"}), 404
+    return jsonify(recipe_information)
 
 @app.route('/recipes/getBulkRecipeInformation', methods=['GET'])
 def get_bulk_recipe_information():
@@ -162,80 +402,73 @@ def get_bulk_recipe_information():
         
         if not recipe_ids:
             return jsonify({"error": "No recipe IDs provided"}), 400
-            
-        # Make API call to get bulk recipe information
-        url = 'https://api.spoonacular.com/recipes/informationBulk'
-        params = {
-            'apiKey': API_KEY,
-            'ids': recipe_ids  # The API expects comma-separated IDs
-        }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
+
+        try:
+            ids = list(dict.fromkeys(int(recipe_id) for recipe_id in recipe_ids.split(',') if recipe_id.strip()))
+        except ValueError:
+            return jsonify({"error": "Recipe IDs must be integers"}), 400
+
+        # Cached details are served locally, the rest go out in one bulk call
+        try:
+            details = recipe_details.get_many(ids)
+        except QuotaExceeded:
+            quota_fallback('local-index')
+            details = {recipe_id: recipe_index.details(recipe_id) for recipe_id in ids}
         
         # Return the detailed recipe information for all requested recipes
-        return jsonify(response.json())
+        return jsonify([details[recipe_id] for recipe_id in ids if details[recipe_id] is not None])
         
     except requests.exceptions.RequestException as e:
         return jsonify({'error': str(e)}), 500
 
 
-def load_fridge(filename="fridge.txt"):
-    try:
-        with open(filename, "r", encoding="utf-8") as file:
-            reader = csv.DictReader(file)
-            return [dict(row) for row in reader]
-    except FileNotFoundError:
-        print(f"Error: The file '{filename}' was not found.")
-        return []
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return []
+def load_fridge():
+    # Served from the store's in-memory copy, no disk parsing
+    return fridge_store.items()
 
 def extract_names(items):
     return [item["name"] for item in items if isinstance(item, dict) and "name" in item]
 
-def save_fridge(fridge):
-    with open("fridge.txt", "w") as f:
-        f.write("name,quantity,imageUrl\n")
-        for item in fridge:
-            f.write(f"{item['name']},{item['quantity']},{item['imageUrl']}\n")
+def with_absolute_images(fridge):
+    # Thumbnails are served by this backend, so the frontend needs our origin in front
+    root = request.url_root.rstrip('/')
+    return [
+        {**item, 'imageUrl': root + item['imageUrl']} if item['imageUrl'].startswith('/') else item
+        for item in fridge
+    ]
+
+def resolve_fridge_image(name):
+    image_resolver.resolve_async(name, lambda image_url: fridge_store.set_image(name, image_url))
+
+def refresh_hotlinked_images():
+    """Replace expiring pixabay.com/get/ links saved by older versions with local thumbnails"""
+    for item in load_fridge():
+        if 'pixabay.com/get/' in item['imageUrl']:
+            resolve_fridge_image(item['name'])
+
+@app.route('/recipes/fridgeImages/<path:filename>', methods=['GET'])
+def get_fridge_image(filename):
+    return send_from_directory(THUMBNAILS_DIR, filename, max_age=7 * 24 * 60 * 60)
 
 @app.route('/recipes/getFridgeItems', methods=['GET'])
 def get_fridge_items():
     fridge = load_fridge()
-    return jsonify(fridge)
+    return jsonify(with_absolute_images(fridge))
 
 @app.route('/recipes/addFridgeItem', methods=['POST'])
-def add_fridge(filename="fridge.txt"):
+def add_fridge():
     name = request.json.get("name")
     quantity = request.json.get("quantity")
 
     if not name or not quantity:
         return jsonify({"error": "Missing name or quantity"}), 400
-    
-    params = {
-        "key": PIXABAY_API_KEY,
-        "q": name,
-        "image_type": "photo",
-        "pretty": True,
-        "category": "food"
-    }
-    response = requests.get(PIXABAY_URL, params=params)
-    print("Pixabay API URL:", response.url)
-    if response.status_code != 200:
-        return jsonify({"error": "Failed to fetch image"}), 500
-    
-    data = response.json()
-    if "hits" in data and len(data["hits"]) > 0:
-        image_url = data["hits"][0]["webformatURL"]
-    else:
-        print("no Images found")
 
     try:
-        with open(filename, "a", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            writer.writerow([name.lower(), quantity, image_url])  # Append new item
+        # The row is written right away, the image is filled in by a background worker
+        item = fridge_store.add(name, quantity, request.json.get("imageUrl") or "")  # Merges into an existing row
+        if not item["imageUrl"]:
+            resolve_fridge_image(item["name"])
+        prefetcher.trigger('fridge')
 
         return jsonify({"message": "Ingredient added successfully!"}), 201
 
@@ -248,18 +481,42 @@ def delete_fridge_item():
     if not ingredient:
         return jsonify({"error": "No ingredient provided"}), 400
 
-    fridge = load_fridge()
-    ingredient_lower = ingredient.lower().strip()
-
-    filtered_fridge = [item for item in fridge if item["name"].lower().strip() != ingredient_lower]
-
-    if len(filtered_fridge) == len(fridge):
+    if not fridge_store.delete(ingredient):
         return jsonify({"error": "Ingredient not found"}), 404
-
-    save_fridge(filtered_fridge)
-
-    return jsonify({"message": f"Ingredient '{ingredient}' removed", "fridge": filtered_fridge})
-
+    prefetcher.trigger('fridge')
+
+    return jsonify({"message": f"Ingredient '{ingredient}' removed", "fridge": with_absolute_images(load_fridge())})
+
+
+# Lobby form options -> Spoonacular intolerances; anything else is passed through as is
+SPOONACULAR_INTOLERANCES = {
+    'nuts': ['Peanut', 'Tree Nut'],
+    'eggs': ['Egg'],
+    'fish': ['Seafood'],
+}
+# Lobby form options -> Spoonacular diets; Kosher and Halal have no Spoonacular equivalent
+SPOONACULAR_DIETS = {
+    'vegetarian': 'vegetarian',
+    'vegan': 'vegan',
+    'gluten-free': 'gluten free',
+    'keto': 'ketogenic',
+    'paleo': 'paleo',
+}
+
+def complex_search_params(recipe='', cuisine='', diet='', intolerances=(), recipe_type=''):
+    return {
+        'query': recipe,
+        'cuisine': cuisine,
+        'diet': diet,
+        'intolerances': ','.join(intolerances),
+        'type': recipe_type,
+        'instructionsRequired': True,
+        'fillIngredients': True,
+        'addRecipeInformation': True,
+        'addRecipeInstructions': True,
+        'addRecipeNutrition': True,
+        'number': 3
+    }
 
 @app.route('/recipes/searchRecipe', methods=['GET'])
 def search_recipe():
@@ -270,24 +527,12 @@ def search_recipe():
         intolerances = request.args.get('intolerances', '').split(',')
         recipe_type = request.args.get('recipe_type', '')
         
-        url = 'https://api.spoonacular.com/recipes/complexSearch'
-        params = {
-            'apiKey': API_KEY,
-            'query': recipe,
-            'cuisine': cuisine,
-            'diet': diet,
-            'intolerances': ','.join(intolerances),
-            'type': recipe_type,
-            'instructionsRequired': True,
-            'fillIngredients': True,
-            'addRecipeInformation': True,
-            'addRecipeInstructions': True,
-            'addRecipeNutrition': True,
-            'number': 3
-        }
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return jsonify(response.json())
+        url = f'{SPOONACULAR_URL}/recipes/complexSearch'
+        params = complex_search_params(recipe, cuisine, diet, intolerances, recipe_type)
+        # The local index knows titles only, it can't honour any of the filters
+        filtered = cuisine or diet or recipe_type or any(i.strip() for i in intolerances)
+        local_fallback = None if filtered else lambda: local_search(recipe, params['number'])
+        return spoonacular_response(url, params, local_fallback)
     except requests.exceptions.RequestException as e:
         return jsonify({'error': str(e)}), 500
     
@@ -305,9 +550,8 @@ def search_by_cuisine():
         if not cuisine:
             return jsonify({'error': 'Cuisine is required'}), 400
         
-        url = 'https://api.spoonacular.com/recipes/complexSearch'
+        url = f'{SPOONACULAR_URL}/recipes/complexSearch'
         params = {
-            'apiKey': API_KEY,
             'cuisine': cuisine,
             'diet': diet,
             'type': type,
@@ -322,9 +566,7 @@ def search_by_cuisine():
         # Remove empty string parameters
         params = {k: v for k, v in params.items() if v}
         
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return jsonify(response.json())
+        return spoonacular_response(url, params)
     except requests.exceptions.RequestException as e:
         return jsonify({'error': str(e)}), 500
 
@@ -332,54 +574,27 @@ def search_by_cuisine():
 
 #TODO Get recipe by id
 #TODO Get top 5 recipes ->> search_recipe()
+@lru_cache(maxsize=8)
+def flyer_ingredients(names):
+    # Only names of real ingredients help Spoonacular's ingredient queries; computed once per catalog version
+    return canonical_ingredients(names)
+
 @app.route('/recipes/topRecipesFromIngredients', methods=['GET'])
 def get_top_recipes_from_ingredients():
     try:
         cuisine = request.args.get('cuisine', '')
-        GROCERY_FILE = os.path.join(BASE_DIR, "simplified_results.json")
-        with open(GROCERY_FILE, 'r') as f:
-            grocery_data = json.load(f)
-
-        comestible_categories = [
-            'frozen_and_prepared', 
-            'pantry', 
-            'meat_and_seafood', 
-            'dairy_and_cheese', 
-            'produce', 
-            'snacks',
-            'snacks_and_treats'
-        ]
-        
-        ingredients = []
-        for category in comestible_categories:
-            if category in grocery_data['categories']:
-                for item in grocery_data['categories'][category].keys():
-                    # Clean the ingredient name
-                    cleaned_item = re.sub(r'\(.*?\)', '', item).lower().strip()
-                    
-                    # Split multi-word items and clean individual words
-                    ingredient_words = cleaned_item.split()
-                    
-                    for word in ingredient_words:
-                        # Filter out non-food words and very short words
-                        if (len(word) > 2 and 
-                            word not in ['the', 'and', 'or', 'mix', 'size', 'fresh'] and
-                            not word.isdigit()):
-                            ingredients.append(word)
-        
-        ingredients = list(dict.fromkeys(ingredients))
-        ingredients = ingredients[:20]
-        
-        specific_ingredients = [
-            # 'chicken', 'pasta', 'tomato', 'cheese', 
-            # 'salmon', 'pizza', 'vegetables', 'noodles'
-        ]
+        grocery_data = grocery_catalog.store("simplified")
+        if grocery_data is None:
+            return jsonify({'error': 'No grocery data available'}), 500
+
+        # Written by utils/normalize_results.py; re-checked in case the file was edited by hand
+        ingredients = flyer_ingredients(tuple(grocery_data.ingredients))[:20]
         
-        # Use complexSearch instead of findByIngredients
-        url = 'https://api.spoonacular.com/recipes/complexSearch'
+        # Use complexSearch instead of findByIngredients, ranked by how many of the discounted ingredients each uses
+        url = f'{SPOONACULAR_URL}/recipes/complexSearch'
         params = {
-            'apiKey': API_KEY,
-            'ingredients': ', '.join(specific_ingredients),
+            'includeIngredients': ','.join(ingredients),
+            'sort': 'max-used-ingredients' if ingredients else '',
             'cuisine': cuisine,  # Optional cuisine filter
             'instructionsRequired': True,
             'fillIngredients': True,
@@ -389,9 +604,14 @@ def get_top_recipes_from_ingredients():
         
         params = {k: v for k, v in params.items() if v}
         
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        response_data = response.json()
+        try:
+            response_data = spoonacular_get(url, params)
+        except QuotaExceeded as e:
+            if cuisine:
+                return quota_exhausted(e)
+            quota_fallback('local-index')
+            results = recipe_index.find_by_ingredients(ingredients, params['number'])
+            response_data = {'results': results, 'offset': 0, 'number': params['number'], 'totalResults': len(results)}
 
         return jsonify(response_data)
     
@@ -405,21 +625,11 @@ def get_top_recipes_from_ingredients():
 @app.route('/create-lobby', methods=['POST'])
 def create_lobby():
     lobby_data = request.json
-    lobby_id = lobby_data['lobbyId']
-    
-    # Load existing lobbies or create an empty list
-    if os.path.exists(LOBBY_DATA_FILE):
-        with open(LOBBY_DATA_FILE, 'r') as file:
-            lobbies = json.load(file)
-    else:
-        lobbies = []
+    if not lobby_data or not lobby_data.get('lobbyId'):
+        return jsonify({'message': 'Missing lobbyId'}), 400
 
-    # Add new lobby to the list
-    lobbies.append(lobby_data)
-
-    # Save the updated lobbies data
-    with open(LOBBY_DATA_FILE, 'w') as file:
-        json.dump(lobbies, file, indent=2)
+    if not lobby_store.create_lobby(lobby_data):
+        return jsonify({'message': 'Lobby already exists'}), 409
 
     return jsonify({'message': 'Lobby created successfully'}), 200
 
@@ -427,7 +637,7 @@ def create_lobby():
 @app.route('/lobby/<lobby_id>', methods=['GET'])
 def get_lobby(lobby_id):
     # Assuming you fetch the lobby details from a database or file
-    lobby = get_lobby_by_id(lobby_id)  # This function retrieves the lobby info by ID
+    lobby = lobby_store.get_lobby(lobby_id, with_participants=False)
     
     if lobby is None:
         return jsonify({'error': 'Lobby not found'}), 404
@@ -441,99 +651,142 @@ def get_lobby(lobby_id):
 # Endpoint to submit dietary information for a lobby
 @app.route('/submit-dietary-info/<lobby_id>', methods=['POST'])
 def submit_dietary_info(lobby_id):
-    dietary_info = request.json
-    
-    # Load existing lobbies
-    if os.path.exists(LOBBY_DATA_FILE):
-        with open(LOBBY_DATA_FILE, 'r') as file:
-            lobbies = json.load(file)
-    else:
-        return jsonify({'message': 'No lobby data found'}), 404
-
-    # Find the lobby by ID
-    lobby = next((lobby for lobby in lobbies if lobby['lobbyId'] == lobby_id), None)
+    dietary_info = request.get_json(silent=True)
+    if not isinstance(dietary_info, dict):
+        return jsonify({'message': 'Expected a JSON object'}), 400
+    # These feed the lobby's constraint counts and, from there, Spoonacular's intolerances
+    for field in CONSTRAINT_FIELDS:
+        values = dietary_info.get(field)
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            return jsonify({'message': f'{field} must be a list of strings'}), 400
 
-    if not lobby:
+    # Append the dietary information to the participants
+    participant_count = lobby_store.add_participant(lobby_id, dietary_info)
+    if participant_count is None:
         return jsonify({'message': 'Lobby not found'}), 404
 
-    # Append the dietary information to the participants
-    if 'participants' not in lobby:
-        lobby['participants'] = []
+    # Open lobby streams get the new record only once it is committed
+    lobby_events.publish(lobby_id, (participant_count, dietary_info))
 
-    lobby['participants'].append(dietary_info)
+    return jsonify({'message': 'Dietary information submitted successfully'}), 200
 
-    # Save the updated lobbies data
-    with open(LOBBY_DATA_FILE, 'w') as file:
-        json.dump(lobbies, file, indent=2)
 
-    return jsonify({'message': 'Dietary information submitted successfully'}), 200
+def lobby_search_constraints(constraints):
+    """Every participant must be able to eat the recipe: all allergies excluded, all diets required"""
+    intolerances = []
+    for allergy in constraints['allergies']:
+        intolerances.extend(SPOONACULAR_INTOLERANCES.get(allergy.lower(), [allergy]))
+    diets = [SPOONACULAR_DIETS[d.lower()] for d in constraints['dietaryRestrictions'] if d.lower() in SPOONACULAR_DIETS]
+    # Spoonacular treats a comma-separated diet list as AND
+    return ','.join(dict.fromkeys(diets)), list(dict.fromkeys(intolerances))
 
+@app.route('/lobby/<lobby_id>/recommendations', methods=['GET'])
+def get_lobby_recommendations(lobby_id):
+    constraints = lobby_store.get_constraints(lobby_id)
+    if constraints is None:
+        return jsonify({'message': 'Lobby not found'}), 404
 
-@app.route('/get-participants/<lobby_id>', methods=['GET'])
-def get_participants(lobby_id):
-    if os.path.exists(LOBBY_DATA_FILE):
-        with open(LOBBY_DATA_FILE, 'r') as file:
-            lobbies = json.load(file)
-    else:
-        return jsonify({'message': 'No lobby data found'}), 404
+    diet, intolerances = lobby_search_constraints(constraints)
+    try:
+        url = f'{SPOONACULAR_URL}/recipes/complexSearch'
+        params = complex_search_params(
+            request.args.get('recipe', ''),
+            request.args.get('cuisine', ''),
+            diet,
+            intolerances,
+            request.args.get('recipe_type', ''),
+        )
+        # Charged to the lobby so one busy lobby can't spend everyone's quota; without
+        # Spoonacular the constraints can't be checked, so there is no local fallback
+        recipes = spoonacular_get(url, params, owner=f'lobby:{lobby_id}')
+        return jsonify({'constraints': constraints, 'recipes': recipes})
+    except QuotaExceeded as e:
+        return quota_exhausted(e)
+    except requests.exceptions.RequestException as e:
+        return jsonify({'error': str(e)}), 500
 
-    lobby = next((lobby for lobby in lobbies if lobby['lobbyId'] == lobby_id), None)
 
-    if not lobby:
+@app.route('/get-participants/<lobby_id>', methods=['GET'])
+def get_participants(lobby_id):
+    if lobby_store.get_lobby(lobby_id, with_participants=False) is None:
         return jsonify({'message': 'Lobby not found'}), 404
 
-    participants = lobby.get('participants', [])
+    participants = lobby_store.get_participants(lobby_id)
 
     return jsonify({'participants': participants}), 200
 
 
+SSE_HEARTBEAT_SECONDS = 15
 
-@app.route('/recipes/groceries', methods=['GET'])
-def get_groceries():
-    grocery_discounts = {
-        "iga": load_grocery_with_price_json("iga_results.json"),
-        "metro": load_grocery_with_price_json("metro_results.json"),
-        "super c": load_grocery_with_price_json("super_results.json"),
-    }
-    
-    return jsonify(grocery_discounts)
-
-def load_grocery_json(filename="iga_results.json"):
-    with open(filename, 'r') as file:
-        data = json.load(file)
+def sse_frame(event, data, event_id=None):
+    frame = f"event: {event}\n"
+    if event_id is not None:
+        frame += f"id: {event_id}\n"
+    return frame + f"data: {json.dumps(data)}\n\n"
 
-    food_names = []
-    for category, items in data["categories"].items():
-        food_names.extend(items.keys())
+@app.route('/lobby/<lobby_id>/events', methods=['GET'])
+def stream_lobby_events(lobby_id):
+    """Server-sent events: the current participants, then each new one as it is submitted"""
+    if lobby_store.get_lobby(lobby_id, with_participants=False) is None:
+        return jsonify({'message': 'Lobby not found'}), 404
 
-    return food_names
+    # Subscribe before reading so nothing committed in between is missed
+    subscription = lobby_events.subscribe(lobby_id)
+    if subscription is None:
+        return jsonify({'message': 'Too many listeners for this lobby'}), 503, {'Retry-After': '5'}
 
-def load_grocery_with_price_json(filename="iga_results.json"):
     try:
-        with open(filename, 'r') as file:
-            data = json.load(file)
-    except FileNotFoundError:
-        return []
-    
-    food_items = []
-    for category, items in data["categories"].items():
-        for name, price in items.items():
-            food_items.append({"name": name, "price": price})
-    
-    return food_items
+        seen = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        seen = 0
+    participants = lobby_store.get_participants(lobby_id)
 
-def get_price(item, filename="iga_results.json"):
-    try:
-        with open(filename, 'r') as file:
-            data = json.load(file)
-    except FileNotFoundError:
-        return None
+    def generate():
+        nonlocal seen
+        try:
+            # A reconnecting client only gets what it missed
+            yield sse_frame('participants', participants[seen:], len(participants))
+            seen = len(participants)
+            while not subscription.closed:
+                event = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ': heartbeat\n\n'
+                    continue
+                position, participant = event
+                if position <= seen:
+                    continue
+                if position > seen + 1:
+                    # Submissions publish after their commit, so a later one can arrive
+                    # first; fill the gap from the store instead of skipping it
+                    missed = lobby_store.get_participants(lobby_id)[seen:position]
+                    for offset, missed_participant in enumerate(missed, seen + 1):
+                        yield sse_frame('participant', missed_participant, offset)
+                else:
+                    yield sse_frame('participant', participant, position)
+                seen = position
+        finally:
+            lobby_events.unsubscribe(subscription)
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+
+
+
+@app.route('/recipes/groceries', methods=['GET'])
+def get_groceries():
+    # The payload is serialized once per catalog reload, not per request
+    snapshot = grocery_catalog.snapshot()
+    return json_body_response(snapshot.groceries_payload, snapshot.groceries_etag)
+
+def load_grocery_json(store="iga"):
+    return list(grocery_catalog.names(store))
+
+def load_grocery_with_price_json(store="iga"):
+    return grocery_catalog.items_with_price(store)
 
-    for category, items in data["categories"].items():
-        for name, price in items.items():
-            if item.lower() in name.lower():
-                return float(price)
-    return 0
+def get_price(item):
+    return price_index.get_price(item)
 
 if __name__ == '__main__':
+    refresh_hotlinked_images()
     app.run(debug=True)
\ No newline at end of file
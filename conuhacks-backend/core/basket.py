@@ -0,0 +1,78 @@
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from fuzzy_match import FuzzyMatcher
+from price_index import PriceIndex, normalize_name
+
+
+class BasketPricer:
+    """Prices the shopping basket of many recipes at once across every flyer store.
+
+    The basket of a recipe is every ingredient the fridge doesn't cover. The
+    ingredients of the whole batch are priced once into an (ingredients x stores)
+    matrix, and a (recipes x ingredients) incidence matrix turns that into every
+    per-store and mixed-store total with a few matrix products. The savings figure
+    compares the mixed-store basket against buying each ingredient at the most
+    expensive flyer that carries it.
+    """
+
+    def __init__(self, price_index: PriceIndex):
+        self.price_index = price_index
+
+    def price_recipes(self, recipes: List[Dict], owned: Iterable[str] = ()) -> List[Dict]:
+        stores = self.price_index.stores
+        baskets = []
+        for recipe in recipes:
+            ingredients = recipe.get("usedIngredients", []) + recipe.get("missedIngredients", [])
+            names = (normalize_name(ingredient.get("name", "")) for ingredient in ingredients)
+            baskets.append(list(dict.fromkeys(name for name in names if name)))
+
+        # "eggs" in the fridge covers "large egg" in a recipe
+        needed = list(dict.fromkeys(name for basket in baskets for name in basket))
+        fridge_matches = FuzzyMatcher([normalize_name(name) for name in owned]).match(needed)
+        owned = {name for name, match in zip(needed, fridge_matches) if match is not None}
+        baskets = [[name for name in basket if name not in owned] for basket in baskets]
+
+        columns = list(dict.fromkeys(name for basket in baskets for name in basket))
+        position = {name: i for i, name in enumerate(columns)}
+        incidence = np.zeros((len(recipes), len(columns)))
+        for row, basket in enumerate(baskets):
+            incidence[row, [position[name] for name in basket]] = 1
+
+        prices = self.price_index.store_prices(columns)
+        available = np.isfinite(prices)
+        priced = available.any(axis=1)
+        cheapest_store = np.argmin(prices, axis=1) if columns else np.zeros(0, dtype=np.intp)
+        cheapest = np.where(priced, prices.min(axis=1, initial=np.inf), 0.0)
+        priciest = np.where(priced, np.where(available, prices, -np.inf).max(axis=1, initial=-np.inf), 0.0)
+
+        mixed_totals = incidence @ cheapest
+        original_totals = incidence @ priciest
+        store_totals = incidence @ np.where(available, prices, 0.0)
+        # A store can supply the whole basket when it carries every ingredient any store carries
+        complete = (incidence @ available) == (incidence @ priced)[:, None]
+        single_totals = np.where(complete, store_totals, np.inf)
+
+        priced_recipes = []
+        for row, recipe in enumerate(recipes):
+            basket = [
+                {"name": name, "store": stores[cheapest_store[position[name]]],
+                 "price": round(float(cheapest[position[name]]), 2)}
+                for name in baskets[row] if priced[position[name]]
+            ]
+            best_store = int(np.argmin(single_totals[row]))
+            priced_recipes.append({
+                **recipe,
+                "total_price": round(float(mixed_totals[row]), 2),
+                "original_price": round(float(original_totals[row]), 2),
+                "savings": round(float(original_totals[row] - mixed_totals[row]), 2),
+                "store_totals": {
+                    store: round(float(single_totals[row, i]), 2) if complete[row, i] else None
+                    for i, store in enumerate(stores)
+                },
+                "cheapest_store": stores[best_store] if np.isfinite(single_totals[row, best_store]) else None,
+                "basket": basket,
+                "unpriced": [name for name in baskets[row] if not priced[position[name]]],
+            })
+        return priced_recipes
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+CATALOG_FILES = {
+    "iga": "iga_results.json",
+    "metro": "metro_results.json",
+    "super c": "super_results.json",
+    "simplified": "simplified_results.json",
+}
+
+# Stores shown on the discounts pages and used for pricing, IGA first
+FLYER_STORES = ["iga", "metro", "super c"]
+
+
+class StoreData:
+    """One parsed flyer file: (name, price) pairs grouped by category"""
+
+    def __init__(self, store: str, categories: Dict[str, List[tuple]], valid_dates: Optional[Dict] = None,
+                 ingredients: Optional[List[str]] = None):
+        self.store = store
+        self.categories = categories
+        self.valid_dates = valid_dates or {}
+        # Precomputed by utils/normalize_results.py; raw flyer files don't have them
+        self.ingredients = ingredients or []
+        self.items = [item for items in categories.values() for item in items]
+        self.names = [name for name, _ in self.items]
+
+    @classmethod
+    def load(cls, store: str, path: str) -> "StoreData":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        categories = {
+            category: list(items.items())
+            for category, items in data.get("categories", {}).items()
+        }
+        return cls(store, categories, data.get("valid_dates"), data.get("ingredients"))
+
+    def items_with_price(self) -> List[Dict]:
+        return [{"name": name, "price": price} for name, price in self.items]
+
+
+class Snapshot:
+    """Immutable view of every store file at one point in time"""
+
+    def __init__(self, stores: Dict[str, StoreData], mtimes: Dict[str, Optional[int]], version: int):
+        self.stores = stores
+        self.mtimes = mtimes
+        self.version = version
+        self.groceries_payload = json.dumps(
+            {store: stores[store].items_with_price() if store in stores else [] for store in FLYER_STORES}
+        ).encode("utf-8")
+        # Strong ETag for /recipes/groceries, changes only when the payload does
+        self.groceries_etag = hashlib.blake2b(self.groceries_payload, digest_size=16).hexdigest()
+
+    def store(self, name: str) -> Optional[StoreData]:
+        return self.stores.get(name)
+
+
+class GroceryCatalog:
+    """Shared, hot-reloading view of the grocery flyer results.
+
+    Each file is parsed once and re-parsed only when its mtime changes. A reload
+    builds a new Snapshot and swaps it in with a single assignment, so a request
+    always reads a consistent set of stores.
+    """
+
+    def __init__(self, data_dir: str, files: Dict[str, str] = CATALOG_FILES):
+        self.data_dir = data_dir
+        self.files = files
+        self._lock = threading.Lock()
+        self._snapshot = Snapshot({}, {}, 0)
+
+    def _mtime(self, filename: str) -> Optional[int]:
+        try:
+            return os.stat(os.path.join(self.data_dir, filename)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _stale(self, snapshot: Snapshot) -> Dict[str, Optional[int]]:
+        mtimes = {store: self._mtime(filename) for store, filename in self.files.items()}
+        return mtimes if mtimes != snapshot.mtimes else {}
+
+    def snapshot(self) -> Snapshot:
+        snapshot = self._snapshot
+        mtimes = self._stale(snapshot)
+        if not mtimes:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            mtimes = self._stale(snapshot)
+            if not mtimes:
+                return snapshot
+
+            stores = {}
+            for store, filename in self.files.items():
+                if mtimes[store] is None:
+                    continue
+                if mtimes[store] == snapshot.mtimes.get(store) and store in snapshot.stores:
+                    stores[store] = snapshot.stores[store]
+                    continue
+                try:
+                    stores[store] = StoreData.load(store, os.path.join(self.data_dir, filename))
+                except (OSError, json.JSONDecodeError) as e:
+                    print(f"Could not load {filename}: {e}")
+                    if store in snapshot.stores:
+                        stores[store] = snapshot.stores[store]
+
+            self._snapshot = Snapshot(stores, mtimes, snapshot.version + 1)
+            return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self.snapshot().version
+
+    def store(self, name: str) -> Optional[StoreData]:
+        return self.snapshot().store(name)
+
+    def names(self, store: str) -> List[str]:
+        data = self.store(store)
+        return data.names if data else []
+
+    def items_with_price(self, store: str) -> List[Dict]:
+        data = self.store(store)
+        return data.items_with_price() if data else []
+
+    def groceries_payload(self) -> bytes:
+        return self.snapshot().groceries_payload
@@ -0,0 +1,177 @@
+import csv
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from fuzzy_match import stem
+
+
+def normalize_ingredient(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def merge_quantities(current: str, added: str) -> str:
+    try:
+        total = float(current) + float(added)
+    except (TypeError, ValueError):
+        # "2 cups" and "1" can't be summed; keep both rather than lose one
+        parts = [str(part).strip() for part in (current, added) if part is not None and str(part).strip()]
+        return " + ".join(parts)
+    return str(int(total)) if total.is_integer() else str(total)
+
+
+def stem_key(name: str) -> str:
+    # Fuzzier matching merges distinct rows ("bench item 1" into "bench item 0"); plurals are enough here
+    return " ".join(stem(word) for word in name.split())
+
+
+class FridgeStore:
+    """Fridge inventory keyed by normalized ingredient name.
+
+    Rows are persisted in SQLite and mirrored in memory, so reads never touch
+    the table; the mirror is reloaded when SQLite's data_version shows another
+    process (another worker) committed to the file. Adding an ingredient that is already in the fridge, or a spelling
+    that only differs by plurals ("Tomatoes" for "tomato"), adds to its
+    quantity instead of creating a duplicate row.
+    """
+
+    def __init__(self, db_path: str, legacy_csv_path: Optional[str] = None):
+        self.db_path = db_path
+        self.legacy_csv_path = legacy_csv_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS fridge (
+                    name TEXT PRIMARY KEY,
+                    quantity TEXT NOT NULL,
+                    image_url TEXT NOT NULL DEFAULT '',
+                    position INTEGER NOT NULL
+                )"""
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS fridge_position ON fridge (position)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        self._items: "OrderedDict[str, Dict]" = OrderedDict()
+        self._by_stem: Optional[Dict[str, str]] = None
+        self._data_version = None
+        self.migrate_from_csv()
+        self._load()
+
+    def _load(self):
+        # Caller holds self._lock (or is __init__)
+        self._items = OrderedDict(
+            (name, {"name": name, "quantity": quantity, "imageUrl": image_url})
+            for name, quantity, image_url in self._db.execute(
+                "SELECT name, quantity, image_url FROM fridge ORDER BY position"
+            )
+        )
+        self._by_stem = None
+        self._data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync(self):
+        """Reload the mirror if another connection committed since it was read"""
+        # Caller holds self._lock; data_version only moves for other connections' commits
+        if self._db.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._load()
+
+    def migrate_from_csv(self) -> int:
+        """Import the legacy fridge.txt once, merging duplicate rows"""
+        if not self.legacy_csv_path or not os.path.exists(self.legacy_csv_path):
+            return 0
+        if self._db.execute("SELECT 1 FROM meta WHERE key = 'fridge_csv_migrated'").fetchone():
+            return 0
+
+        with open(self.legacy_csv_path, "r", encoding="utf-8") as file:
+            rows = [row for row in csv.DictReader(file) if row.get("name")]
+
+        merged: "OrderedDict[str, Dict]" = OrderedDict()
+        for row in rows:
+            name = normalize_ingredient(row["name"])
+            if name in merged:
+                merged[name]["quantity"] = merge_quantities(merged[name]["quantity"], row.get("quantity"))
+            else:
+                merged[name] = {"quantity": row.get("quantity") or "1", "imageUrl": row.get("imageUrl") or ""}
+
+        with self._db:
+            for position, (name, item) in enumerate(merged.items()):
+                self._db.execute(
+                    "INSERT OR IGNORE INTO fridge (name, quantity, image_url, position) VALUES (?, ?, ?, ?)",
+                    (name, item["quantity"], item["imageUrl"], position),
+                )
+            self._db.execute("INSERT INTO meta (key, value) VALUES ('fridge_csv_migrated', ?)", (str(len(merged)),))
+        print(f"Imported {len(merged)} fridge items from {self.legacy_csv_path}")
+        return len(merged)
+
+    def items(self) -> List[Dict]:
+        with self._lock:
+            self._sync()
+            return [dict(item) for item in self._items.values()]
+
+    def _resolve(self, name: str) -> str:
+        """Key of the fridge row this name refers to, or its normalized form if there is none"""
+        key = normalize_ingredient(name)
+        if key in self._items:
+            return key
+        if self._by_stem is None:
+            # Rebuilt lazily after the set of names changes
+            self._by_stem = {stem_key(name): name for name in self._items}
+        return self._by_stem.get(stem_key(key), key)
+
+    def get(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            self._sync()
+            item = self._items.get(self._resolve(name))
+        return dict(item) if item else None
+
+    def add(self, name: str, quantity, image_url: str = "") -> Dict:
+        """Add an ingredient, merging its quantity into an existing row"""
+        with self._lock:
+            self._sync()
+            key = self._resolve(name)
+            existing = self._items.get(key)
+            if existing:
+                item = dict(existing)
+                item["quantity"] = merge_quantities(existing["quantity"], quantity)
+                item["imageUrl"] = existing["imageUrl"] or image_url or ""
+            else:
+                item = {"name": key, "quantity": str(quantity), "imageUrl": image_url or ""}
+                self._by_stem = None
+
+            with self._db:
+                self._db.execute(
+                    """INSERT INTO fridge (name, quantity, image_url, position)
+                       VALUES (?, ?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM fridge))
+                       ON CONFLICT (name) DO UPDATE SET quantity = excluded.quantity, image_url = excluded.image_url""",
+                    (key, item["quantity"], item["imageUrl"]),
+                )
+            self._items[key] = item
+            return dict(item)
+
+    def set_image(self, name: str, image_url: str) -> bool:
+        with self._lock:
+            self._sync()
+            key = self._resolve(name)
+            if key not in self._items:
+                return False
+            with self._db:
+                self._db.execute("UPDATE fridge SET image_url = ? WHERE name = ?", (image_url, key))
+            self._items[key] = {**self._items[key], "imageUrl": image_url}
+            return True
+
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            self._sync()
+            key = self._resolve(name)
+            if key not in self._items:
+                return False
+            with self._db:
+                self._db.execute("DELETE FROM fridge WHERE name = ?", (key,))
+            del self._items[key]
+            self._by_stem = None
+            return True
@@ -0,0 +1,126 @@
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+NGRAM_SIZE = 3
+# Share of the shorter name's weight found in the other one: "egg" vs "eggplant" scores ~0.5
+CONTAINMENT_THRESHOLD = 0.75
+
+
+def stem(word: str) -> str:
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def features(name: str) -> set:
+    """Whole (singular) words plus character n-grams of each word, with word boundaries"""
+    words = [stem(word) for word in re.findall(r"[a-z0-9]+", name.lower())]
+    grams = set()
+    for word in words:
+        grams.add("w:" + word)
+        padded = f" {word} "
+        grams.update(padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1))
+    return grams
+
+
+class FuzzyMatcher:
+    """TF-IDF n-gram vectors of a fixed list of names, matched in bulk.
+
+    Every name becomes a sparse row of IDF-weighted word and character n-gram
+    features, kept as an inverted index (feature -> names using it), so memory
+    grows with the number of n-grams rather than names x vocabulary. Matching a
+    batch of queries walks only the names sharing a feature with each query. Two
+    scores come out of the same overlap: cosine similarity, and containment (the
+    overlap divided by the smaller of the two weights), which is 1 when one name
+    is a word-aligned part of the other ("chicken" in "fresh chicken thighs") but
+    stays low for mere substrings ("egg" in "eggplant").
+    """
+
+    def __init__(self, names: Sequence[str]):
+        self.names = list(names)
+        name_features = [features(name) for name in self.names]
+        document_frequency: Dict[str, int] = {}
+        for grams in name_features:
+            for gram in grams:
+                document_frequency[gram] = document_frequency.get(gram, 0) + 1
+
+        count = len(self.names)
+        self.vocabulary = {gram: i for i, gram in enumerate(document_frequency)}
+        self.idf = np.array(
+            [math.log((1 + count) / (1 + document_frequency[gram])) + 1 for gram in self.vocabulary]
+        )
+        # Features the names never use weigh as much as the rarest ones
+        self.unseen_idf = math.log(1 + count) + 1
+
+        indptr, indices, self.weights = self._vectorize(name_features)
+        self.norms = np.sqrt(self.weights)
+        # Transpose the CSR rows into feature -> names, what the overlap walks
+        rows = np.repeat(np.arange(count, dtype=np.intp), np.diff(indptr))
+        self._feature_names = rows[np.argsort(indices, kind="stable")]
+        self._feature_ptr = np.zeros(len(self.vocabulary) + 1, dtype=np.intp)
+        np.cumsum(np.bincount(indices, minlength=len(self.vocabulary)), out=self._feature_ptr[1:])
+
+    def _vectorize(self, all_features: List[set]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """CSR layout (row pointers, feature columns) and squared vector length of each row"""
+        indptr = np.zeros(len(all_features) + 1, dtype=np.intp)
+        indices: List[int] = []
+        weights = np.zeros(len(all_features))
+        for row, grams in enumerate(all_features):
+            columns = [self.vocabulary[gram] for gram in grams if gram in self.vocabulary]
+            indices.extend(columns)
+            indptr[row + 1] = len(indices)
+            unseen = len(grams) - len(columns)
+            weights[row] = float(np.sum(self.idf[columns] ** 2)) + unseen * self.unseen_idf ** 2
+        return indptr, np.array(indices, dtype=np.intp), weights
+
+    def _overlap(self, indptr: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """(queries x names) dot products; a shared feature adds idf^2, its weight in both vectors"""
+        queries = len(indptr) - 1
+        query_rows = np.repeat(np.arange(queries, dtype=np.intp), np.diff(indptr))
+        starts = self._feature_ptr[indices]
+        counts = self._feature_ptr[indices + 1] - starts
+        # Position of every (query feature, name using it) pair in _feature_names
+        offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        name_rows = self._feature_names[offsets + np.arange(int(counts.sum()), dtype=np.intp)]
+        cells = np.repeat(query_rows, counts) * len(self.names) + name_rows
+        overlap = np.bincount(cells, weights=np.repeat(self.idf[indices] ** 2, counts),
+                              minlength=queries * len(self.names))
+        return overlap.reshape(queries, len(self.names))
+
+    def similarity(self, queries: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(queries x names) cosine and containment scores"""
+        if not queries or not self.names:
+            empty = np.zeros((len(queries), len(self.names)))
+            return empty, empty
+        indptr, indices, query_weights = self._vectorize([features(query) for query in queries])
+        overlap = self._overlap(indptr, indices)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cosine = overlap / np.outer(np.sqrt(query_weights), self.norms)
+            containment = overlap / np.minimum.outer(query_weights, self.weights)
+        return np.nan_to_num(cosine), np.nan_to_num(containment)
+
+    def match(self, queries: Sequence[str], threshold: float = CONTAINMENT_THRESHOLD,
+              containment: bool = True) -> List[Optional[int]]:
+        """Best name index for each query, or None when nothing clears the threshold.
+
+        With containment=True any name containing the query (or contained in it)
+        qualifies, and the most similar of those wins; otherwise the names must be
+        near-identical by cosine similarity.
+        """
+        cosine, contained = self.similarity(queries)
+        if not self.names:
+            return [None] * len(queries)
+        score = contained if containment else cosine
+        ranked = np.where(score >= threshold, cosine, -1.0)
+        best = np.argmax(ranked, axis=1)
+        return [int(index) if ranked[row, index] >= 0 else None for row, index in enumerate(best)]
+
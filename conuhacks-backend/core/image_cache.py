@@ -0,0 +1,112 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+PIXABAY_URL = "https://pixabay.com/api/"
+
+
+def image_slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "item"
+
+
+class ImageResolver:
+    """Resolves ingredient images from Pixabay in a background worker pool.
+
+    Each ingredient name is looked up at most once: the thumbnail is downloaded
+    into thumbnails_dir and served by the backend, so later adds of the same name
+    reuse the local file and the frontend never hotlinks expiring Pixabay URLs.
+    """
+
+    def __init__(self, http_client, api_key: Optional[str], thumbnails_dir: str, url_prefix: str,
+                 max_workers: int = 4, search_url: str = PIXABAY_URL):
+        self.http_client = http_client
+        self.api_key = api_key
+        self.search_url = search_url
+        self.thumbnails_dir = thumbnails_dir
+        self.url_prefix = url_prefix.rstrip("/")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pixabay")
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, List[Callable[[str], None]]] = {}
+        self._missing = set()
+        self.stats = {"local_hits": 0, "lookups": 0, "failures": 0}
+        os.makedirs(thumbnails_dir, exist_ok=True)
+
+    def local_url(self, name: str) -> Optional[str]:
+        filename = f"{image_slug(name)}.jpg"
+        if os.path.exists(os.path.join(self.thumbnails_dir, filename)):
+            return f"{self.url_prefix}/{filename}"
+        return None
+
+    def resolve_async(self, name: str, on_resolved: Callable[[str], None]):
+        """Call on_resolved(url) once an image for name is available locally"""
+        url = self.local_url(name)
+        if url:
+            with self._lock:
+                self.stats["local_hits"] += 1
+            on_resolved(url)
+            return
+
+        slug = image_slug(name)
+        with self._lock:
+            if slug in self._missing:
+                return
+            if slug in self._in_flight:
+                self._in_flight[slug].append(on_resolved)
+                return
+            self._in_flight[slug] = [on_resolved]
+        self._executor.submit(self._resolve, name, slug)
+
+    def _resolve(self, name: str, slug: str):
+        url = None
+        with self._lock:
+            self.stats["lookups"] += 1
+        try:
+            url = self._download(name, slug)
+            if url is None:
+                with self._lock:
+                    self._missing.add(slug)
+        except Exception as e:
+            with self._lock:
+                self.stats["failures"] += 1
+            print(f"Could not resolve image for {name}: {e}")
+        finally:
+            with self._lock:
+                callbacks = self._in_flight.pop(slug, [])
+
+        if url:
+            for callback in callbacks:
+                try:
+                    callback(url)
+                except Exception as e:
+                    print(f"Image callback for {name} failed: {e}")
+
+    def snapshot_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._in_flight)
+        return stats
+
+    def _download(self, name: str, slug: str) -> Optional[str]:
+        params = {
+            "key": self.api_key,
+            "q": name,
+            "image_type": "photo",
+            "category": "food"
+        }
+        response = self.http_client.get(self.search_url, params=params)
+        response.raise_for_status()
+        hits = response.json().get("hits", [])
+        if not hits:
+            print(f"No images found for {name}")
+            return None
+
+        image = self.http_client.get(hits[0]["webformatURL"])
+        image.raise_for_status()
+
+        path = os.path.join(self.thumbnails_dir, f"{slug}.jpg")
+        with open(path + ".tmp", "wb") as file:
+            file.write(image.content)
+        os.replace(path + ".tmp", path)
+        return f"{self.url_prefix}/{slug}.jpg"
@@ -0,0 +1,76 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fuzzy_match import stem
+from recipe_index import normalize_ingredient
+
+# Spoonacular ingredient names a flyer item can stand for. Flyer names mix these
+# with brands, sizes and marketing words ("frozen", "product", "pops"), which
+# mean nothing to includeIngredients and only dilute its ranking.
+KNOWN_INGREDIENTS = [
+    "alfredo sauce", "almond milk", "almonds", "apple juice", "apples", "applesauce", "apricots", "artichokes",
+    "arugula", "asparagus", "avocado", "bacon", "bagels", "baguette", "baking powder", "baking soda", "bananas",
+    "barbecue sauce", "barley", "basil", "bay leaves", "bbq sauce", "bean sprouts", "beef", "beef broth",
+    "beef stock", "beer", "beets", "bell peppers", "black beans", "blackberries", "blueberries", "bok choy",
+    "bouillon", "bread", "bread crumbs", "breakfast sausage", "brie", "broccoli", "broth", "brown rice",
+    "brown sugar", "brussels sprouts", "buns", "butter", "buttermilk", "butternut squash", "cabbage",
+    "canned tomatoes", "cantaloupe", "capers", "carrots", "cashews", "cauliflower", "celery", "cereal",
+    "cheddar", "cheddar cheese", "cheese", "cherries", "cherry tomatoes", "chicken", "chicken breast",
+    "chicken broth", "chicken drumsticks", "chicken stock", "chicken thighs", "chicken wings", "chickpeas",
+    "chili powder", "chives", "chocolate", "chocolate chips", "chorizo", "cilantro", "cinnamon", "clams",
+    "cocoa powder", "coconut", "coconut milk", "cod", "coffee", "corn", "cornstarch", "cottage cheese",
+    "couscous", "crab", "crackers", "cranberries", "cream", "cream cheese", "cucumbers", "cumin", "dates",
+    "dijon mustard", "dill", "eggplant", "eggs", "feta", "feta cheese", "figs", "fish", "fish sauce", "flour",
+    "garlic", "ginger", "goat cheese", "granola", "grape tomatoes", "grapefruit", "grapes", "greek yogurt",
+    "green beans", "green onions", "ground beef", "ground pork", "ground turkey", "haddock", "halibut", "ham",
+    "heavy cream", "honey", "hot peppers", "hot sauce", "hummus", "jalapenos", "jam", "kale", "ketchup",
+    "kidney beans", "kiwi", "lamb", "leeks", "lemon juice", "lemons", "lentils", "lettuce", "lime juice",
+    "limes", "mango", "maple syrup", "mayonnaise", "milk", "mint", "mozzarella", "mushrooms", "mussels",
+    "mustard", "nectarines", "noodles", "nutmeg", "oats", "olive oil", "olives", "onions", "orange juice",
+    "oranges", "oregano", "paprika", "parmesan", "parsley", "pasta", "pasta sauce", "peaches", "peanut butter",
+    "peanuts", "pears", "peas", "pecans", "pepperoni", "peppers", "pesto", "pickles", "pineapple", "pita",
+    "plums", "pork", "pork chops", "pork loin", "pork tenderloin", "potatoes", "prosciutto", "pumpkin",
+    "quinoa", "radishes", "raisins", "raspberries", "red onion", "rice", "rice noodles", "ricotta",
+    "romaine lettuce", "rosemary", "salami", "salmon", "salsa", "sardines", "sausages", "scallions", "scallops",
+    "shallots", "shrimp", "sour cream", "soy sauce", "spaghetti", "spinach", "squash", "steak", "strawberries",
+    "sugar", "sweet potatoes", "swiss cheese", "thyme", "tilapia", "tofu", "tomato paste", "tomato sauce",
+    "tomato soup", "tomatoes", "tortilla chips", "tortillas", "trout", "tuna", "turkey", "turkey breast",
+    "vanilla extract", "vegetable broth", "vegetable oil", "vegetables", "vinegar", "walnuts", "watermelon",
+    "white mushrooms", "whole wheat bread", "wine", "yogurt", "zucchini",
+]
+
+
+def _words(name: str) -> Tuple[str, ...]:
+    return tuple(stem(word) for word in normalize_ingredient(name).split())
+
+
+# Keyed by singular words, so "tomato" finds "tomatoes"
+_KNOWN: Dict[Tuple[str, ...], str] = {_words(name): name for name in KNOWN_INGREDIENTS}
+_LONGEST = max(len(words) for words in _KNOWN)
+
+
+def canonical_ingredient(name: str) -> Optional[str]:
+    """The most specific known ingredient a name mentions word for word, or None.
+
+    "fresh chicken thighs" gives "chicken thighs", "natural cream cheese product"
+    gives "cream cheese", and "mozzarellissima" or "pizza pops" give nothing.
+    """
+    words = _words(name)
+    for size in range(min(_LONGEST, len(words)), 0, -1):
+        for start in range(len(words) - size + 1):
+            found = _KNOWN.get(words[start:start + size])
+            if found:
+                return found
+    return None
+
+
+def canonical_ingredients(names: Iterable[str]) -> List[str]:
+    """Distinct known ingredients the names stand for, in order; names that stand for none are dropped"""
+    found = []
+    for name in names:
+        # "tortilla chips or salsa" stands for both
+        for alternative in re.split(r",|\bor\b", name):
+            ingredient = canonical_ingredient(alternative)
+            if ingredient is not None:
+                found.append(ingredient)
+    return list(dict.fromkeys(found))
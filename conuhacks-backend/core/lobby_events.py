@@ -0,0 +1,84 @@
+import queue
+import threading
+from typing import Any, Dict, Optional, Set
+
+MAX_SUBSCRIBERS_PER_LOBBY = 50
+# Events a subscriber may fall behind by before it is dropped (it reconnects and catches up)
+QUEUE_SIZE = 64
+
+
+class Subscription:
+    def __init__(self, lobby_id: str, queue_size: int):
+        self.lobby_id = lobby_id
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def get(self, timeout: float) -> Optional[Any]:
+        """Next event, or None when nothing arrived within the timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LobbyEvents:
+    """In-process pub/sub of lobby updates, one topic per lobby.
+
+    Publishing never blocks: a subscriber whose queue is full is closed instead,
+    so one stalled client can't hold up submissions. Each lobby accepts a bounded
+    number of subscribers.
+    """
+
+    def __init__(self, max_subscribers: int = MAX_SUBSCRIBERS_PER_LOBBY, queue_size: int = QUEUE_SIZE):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self.stats = {"published": 0, "delivered": 0, "dropped_subscribers": 0, "rejected_subscribers": 0}
+
+    def subscribe(self, lobby_id: str) -> Optional[Subscription]:
+        """Returns None when the lobby already has max_subscribers listeners"""
+        with self._lock:
+            subscribers = self._subscribers.setdefault(lobby_id, set())
+            if len(subscribers) >= self.max_subscribers:
+                self.stats["rejected_subscribers"] += 1
+                return None
+            subscription = Subscription(lobby_id, self.queue_size)
+            subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.lobby_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.lobby_id]
+
+    def publish(self, lobby_id: str, event: Any) -> int:
+        """Queue an event for every subscriber of the lobby; returns how many got it"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(lobby_id, ()))
+            self.stats["published"] += 1
+
+        delivered = 0
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+                delivered += 1
+            except queue.Full:
+                subscription.closed = True
+                self.unsubscribe(subscription)
+                with self._lock:
+                    self.stats["dropped_subscribers"] += 1
+        with self._lock:
+            self.stats["delivered"] += delivered
+        return delivered
+
+    def snapshot_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "lobbies": len(self._subscribers),
+                "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            }
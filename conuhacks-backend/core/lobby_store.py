@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+# Participant fields folded into the per-lobby constraint aggregate
+CONSTRAINT_FIELDS = ("allergies", "dietaryRestrictions")
+
+
+def empty_constraints() -> Dict:
+    return {"participants": 0, **{field: {} for field in CONSTRAINT_FIELDS}}
+
+
+def add_to_constraints(constraints: Dict, participant: Dict) -> Dict:
+    """Fold one participant's submission into the counts (one pass over their own lists)"""
+    constraints["participants"] += 1
+    for field in CONSTRAINT_FIELDS:
+        counts = constraints[field]
+        for value in dict.fromkeys(value.strip() for value in participant.get(field) or [] if value.strip()):
+            counts[value] = counts.get(value, 0) + 1
+    return constraints
+
+
+class LobbyStore:
+    """SQLite-backed lobby storage (WAL mode).
+
+    Lobbies are keyed by lobbyId and participants live in their own table, so a
+    lookup or a submission touches one lobby instead of the whole file. On first
+    use the legacy store/rooms.json file is imported once.
+
+    Each lobby also keeps a constraint aggregate (participant count and how many
+    participants listed each allergy and dietary restriction), updated in the
+    same transaction as every submission so it never has to be rebuilt from the
+    participant rows.
+    """
+
+    def __init__(self, db_path: str, legacy_json_path: Optional[str] = None):
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        with self._connection() as db:
+            db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS lobbies (
+                    lobby_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS participants (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    lobby_id TEXT NOT NULL REFERENCES lobbies (lobby_id),
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS participants_lobby ON participants (lobby_id, id);
+                CREATE TABLE IF NOT EXISTS lobby_constraints (
+                    lobby_id TEXT PRIMARY KEY REFERENCES lobbies (lobby_id),
+                    data TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                """
+            )
+        self.migrate_from_json()
+        self.backfill_constraints()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads, so each Flask worker gets its own
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            self._local.db = db
+        return db
+
+    def migrate_from_json(self) -> int:
+        """Import the legacy rooms.json once; returns the number of lobbies imported"""
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return 0
+
+        db = self._connection()
+        if db.execute("SELECT 1 FROM meta WHERE key = 'rooms_json_migrated'").fetchone():
+            return 0
+
+        with open(self.legacy_json_path, "r") as file:
+            lobbies = json.load(file)
+
+        imported = 0
+        with db:
+            for lobby in lobbies:
+                lobby = dict(lobby)
+                participants = lobby.pop("participants", None) or []
+                # The JSON store kept duplicates but always served the first one
+                cursor = db.execute(
+                    "INSERT OR IGNORE INTO lobbies (lobby_id, data) VALUES (?, ?)",
+                    (lobby["lobbyId"], json.dumps(lobby)),
+                )
+                if cursor.rowcount == 0:
+                    continue
+                imported += 1
+                self._insert_participants(db, lobby["lobbyId"], participants)
+            db.execute("INSERT INTO meta (key, value) VALUES ('rooms_json_migrated', ?)", (str(imported),))
+        print(f"Imported {imported} lobbies from {self.legacy_json_path}")
+        return imported
+
+    def create_lobby(self, lobby: Dict) -> bool:
+        """Store a new lobby; returns False if the lobbyId is already taken"""
+        lobby = dict(lobby)
+        participants = lobby.pop("participants", None) or []
+        db = self._connection()
+        with db:
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO lobbies (lobby_id, data) VALUES (?, ?)",
+                (lobby["lobbyId"], json.dumps(lobby)),
+            )
+            if cursor.rowcount == 0:
+                return False
+            self._insert_participants(db, lobby["lobbyId"], participants)
+        return True
+
+    def backfill_constraints(self) -> int:
+        """Build the aggregate once for lobbies stored before it existed"""
+        db = self._connection()
+        if db.execute("SELECT 1 FROM meta WHERE key = 'constraints_backfilled'").fetchone():
+            return 0
+        with db:
+            lobby_ids = [row[0] for row in db.execute(
+                "SELECT lobby_id FROM lobbies WHERE lobby_id NOT IN (SELECT lobby_id FROM lobby_constraints)"
+            )]
+            for lobby_id in lobby_ids:
+                constraints = empty_constraints()
+                for participant in self.get_participants(lobby_id):
+                    add_to_constraints(constraints, participant)
+                self._save_constraints(db, lobby_id, constraints)
+            db.execute("INSERT INTO meta (key, value) VALUES ('constraints_backfilled', ?)", (str(len(lobby_ids)),))
+        return len(lobby_ids)
+
+    def _insert_participants(self, db: sqlite3.Connection, lobby_id: str, participants: List[Dict]) -> Dict:
+        # Caller holds the transaction, so the rows and the aggregate always agree
+        db.executemany(
+            "INSERT INTO participants (lobby_id, data) VALUES (?, ?)",
+            [(lobby_id, json.dumps(participant)) for participant in participants],
+        )
+        row = db.execute("SELECT data FROM lobby_constraints WHERE lobby_id = ?", (lobby_id,)).fetchone()
+        constraints = json.loads(row[0]) if row else empty_constraints()
+        for participant in participants:
+            add_to_constraints(constraints, participant)
+        self._save_constraints(db, lobby_id, constraints)
+        return constraints
+
+    def _save_constraints(self, db: sqlite3.Connection, lobby_id: str, constraints: Dict):
+        db.execute(
+            """INSERT INTO lobby_constraints (lobby_id, data) VALUES (?, ?)
+               ON CONFLICT (lobby_id) DO UPDATE SET data = excluded.data""",
+            (lobby_id, json.dumps(constraints)),
+        )
+
+    def get_constraints(self, lobby_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT data FROM lobby_constraints WHERE lobby_id = ?", (lobby_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_lobby(self, lobby_id: str, with_participants: bool = True) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT data FROM lobbies WHERE lobby_id = ?", (lobby_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        lobby = json.loads(row[0])
+        constraints = self.get_constraints(lobby_id) or empty_constraints()
+        # The lobby-level lists are the union of what participants submitted
+        for field in CONSTRAINT_FIELDS:
+            lobby[field] = list(dict.fromkeys(list(lobby.get(field) or []) + list(constraints[field])))
+        if with_participants:
+            lobby["participants"] = self.get_participants(lobby_id)
+        return lobby
+
+    def get_participants(self, lobby_id: str) -> List[Dict]:
+        rows = self._connection().execute(
+            "SELECT data FROM participants WHERE lobby_id = ? ORDER BY id", (lobby_id,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def add_participant(self, lobby_id: str, participant: Dict) -> Optional[int]:
+        """Append a participant to a lobby; returns how many participants the lobby now has,
+        or None if the lobby doesn't exist"""
+        db = self._connection()
+        with db:
+            if db.execute("SELECT 1 FROM lobbies WHERE lobby_id = ?", (lobby_id,)).fetchone() is None:
+                return None
+            constraints = self._insert_participants(db, lobby_id, [participant])
+        return constraints["participants"]
@@ -0,0 +1,223 @@
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, Response, request
+
+# Seconds; the upper bounds of the latency histograms
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Label used for work done outside a request (background image downloads, batch timers)
+BACKGROUND = "background"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{key}="{value}"'.replace("\n", " ") for key, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class _Request:
+    def __init__(self, route: str):
+        self.route = route
+        self.start = time.perf_counter()
+        self.profiler: Optional[cProfile.Profile] = None
+
+
+_current: contextvars.ContextVar[Optional[_Request]] = contextvars.ContextVar("metrics_request", default=None)
+# Set while an instrumented method runs, so the methods it calls aren't timed a second time
+_instrumented: contextvars.ContextVar[bool] = contextvars.ContextVar("metrics_instrumented", default=False)
+
+
+class Metrics:
+    """Per-route timings exposed in the Prometheus text format.
+
+    Every request records its wall time under its route rule. Upstream HTTP calls
+    (per host) and store / file / JSON work (per operation) are attributed to
+    the route they happen in, or to "background" when they run on a worker
+    thread. Collectors registered with add_collector contribute gauges (cache hit
+    ratios and such) computed at scrape time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, Dict, float]]]] = []
+        self.profile_threshold: Optional[float] = None
+        self.profile_dir: Optional[str] = None
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = _labels(**labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _labels(**labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            # Per-bucket counts, then sum and count
+            values = series.setdefault(key, [0.0] * (len(BUCKETS) + 2))
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    values[i] += 1
+                    break
+            values[-2] += seconds
+            values[-1] += 1
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, Dict, float]]]):
+        """collector() yields (gauge name, labels, value) each time /metrics is scraped"""
+        self._collectors.append(collector)
+
+    @staticmethod
+    def current_route() -> str:
+        current = _current.get()
+        return current.route if current is not None else BACKGROUND
+
+    @contextmanager
+    def timed(self, operation: str):
+        """Attribute the enclosed store, file or parsing work to the current route"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_operation(operation, time.perf_counter() - start)
+
+    def record_operation(self, operation: str, seconds: float):
+        self.observe("app_operation_duration_seconds", seconds, route=self.current_route(), operation=operation)
+
+    def record_upstream(self, host: str, seconds: float, status):
+        route = self.current_route()
+        self.observe("app_upstream_duration_seconds", seconds, route=route, host=host)
+        self.inc("app_upstream_requests_total", route=route, host=host, status=status)
+
+    def instrument(self, obj, operation: str, methods: Iterable[str]):
+        """Wrap methods of a store object so their time counts as `operation`.
+
+        Only the outermost instrumented call is recorded: get_lobby calling
+        get_participants counts once, as get_lobby's time.
+        """
+        for method_name in methods:
+            method = getattr(obj, method_name)
+
+            def wrapper(*args, _method=method, **kwargs):
+                if _instrumented.get():
+                    return _method(*args, **kwargs)
+                token = _instrumented.set(True)
+                try:
+                    with self.timed(operation):
+                        return _method(*args, **kwargs)
+                finally:
+                    _instrumented.reset(token)
+
+            setattr(obj, method_name, wrapper)
+
+    def init_app(self, app: Flask, profile_threshold_ms: Optional[float] = None, profile_dir: Optional[str] = None):
+        """Time every request; with a threshold, profile requests and keep reports of the slow ones"""
+        if profile_threshold_ms:
+            self.profile_threshold = profile_threshold_ms / 1000
+            self.profile_dir = profile_dir
+            os.makedirs(profile_dir, exist_ok=True)
+
+        @app.before_request
+        def start_request():
+            current = _Request(request.url_rule.rule if request.url_rule else "unmatched")
+            _current.set(current)
+            if self.profile_threshold is not None:
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                    current.profiler = profiler
+                except ValueError:
+                    pass  # Another request's profiler is active on Pythons with a single global profiler
+
+        @app.after_request
+        def finish_request(response):
+            current = _current.get()
+            if current is None:
+                return response
+            _current.set(None)
+            elapsed = time.perf_counter() - current.start
+            self.observe("app_request_duration_seconds", elapsed, route=current.route)
+            self.inc("app_requests_total", route=current.route, method=request.method, status=response.status_code)
+            if current.profiler is not None:
+                current.profiler.disable()
+                if elapsed >= self.profile_threshold:
+                    self._dump_profile(current, elapsed)
+            return response
+
+        app.add_url_rule("/metrics", "metrics", lambda: Response(self.render(), mimetype="text/plain; version=0.0.4"))
+
+    def _dump_profile(self, current: _Request, elapsed: float):
+        route = re.sub(r"[^A-Za-z0-9]+", "_", current.route).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{route}"
+        path = os.path.join(self.profile_dir, name)
+        current.profiler.dump_stats(path + ".prof")
+        report = io.StringIO()
+        report.write(f"{request.method} {request.full_path} took {elapsed * 1000:.1f} ms\n\n")
+        pstats.Stats(current.profiler, stream=report).sort_stats("cumulative").print_stats(30)
+        with open(path + ".txt", "w", encoding="utf-8") as f:
+            f.write(report.getvalue())
+        print(f"Slow request {request.path} ({elapsed * 1000:.0f} ms), profile saved to {path}.txt")
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {key: list(values) for key, values in series.items()}
+                          for name, series in self._histograms.items()}
+
+        for name, series in sorted(counters.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+
+        for name, series in sorted(histograms.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, values in sorted(series.items()):
+                cumulative = 0.0
+                for bound, count in zip(BUCKETS, values):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', f'{bound:g}')])} {cumulative:g}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {values[-1]:g}")
+                lines.append(f"{name}_sum{_format_labels(key)} {values[-2]:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {values[-1]:g}")
+
+        gauges: Dict[str, List[str]] = {}
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                gauges.setdefault(name, []).append(f"{name}{_format_labels(_labels(**labels))} {float(value):g}")
+        for name, samples in sorted(gauges.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("app_requests_total", "Requests served, by route, method and status")
+metrics.describe("app_request_duration_seconds", "Wall time of each request, by route")
+metrics.describe("app_upstream_requests_total", "Outbound HTTP calls, by route that made them, host and status")
+metrics.describe("app_upstream_duration_seconds", "Time spent in outbound HTTP calls, by route and host")
+metrics.describe("app_operation_duration_seconds", "Time spent in store, file, parsing and matching work, by route and operation")
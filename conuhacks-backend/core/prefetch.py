@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Mutations closer together than this are folded into one recompute
+DEBOUNCE_SECONDS = 2.0
+# How often the watched value (the flyer catalog version) is checked
+POLL_SECONDS = 30.0
+
+
+class Prefetcher:
+    """Debounced background job, re-run whenever its inputs change.
+
+    trigger() asks for a run debounce seconds from now; triggers arriving before
+    then push the run back, so a burst of mutations costs one run. A trigger
+    that arrives while the job is running schedules exactly one more run. When
+    watch is given it is polled every poll_interval seconds and a changed value
+    triggers the job too. Everything happens on one daemon thread, started on
+    the first trigger or by start().
+    """
+
+    def __init__(self, job: Callable[[], Any], debounce: float = DEBOUNCE_SECONDS,
+                 watch: Optional[Callable[[], Any]] = None, poll_interval: float = POLL_SECONDS,
+                 watch_reason: str = "watch"):
+        self.job = job
+        self.debounce = debounce
+        self.watch = watch
+        self.poll_interval = poll_interval
+        self.watch_reason = watch_reason
+        self._cond = threading.Condition()
+        self._due: Optional[float] = None
+        self._reasons: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._watched = watch() if watch is not None else None
+        self.stats = {"triggers": 0, "runs": 0, "coalesced": 0, "failures": 0, "last_run_seconds": 0.0}
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="prefetch")
+                self._thread.start()
+
+    def trigger(self, reason: str):
+        self.start()
+        with self._cond:
+            self.stats["triggers"] += 1
+            if self._due is not None:
+                self.stats["coalesced"] += 1
+            self._reasons[reason] = self._reasons.get(reason, 0) + 1
+            self._due = time.monotonic() + self.debounce
+            self._cond.notify()
+
+    def _poll(self):
+        try:
+            value = self.watch()
+        except Exception as e:
+            print(f"Prefetch watch failed: {e}")
+            return
+        if value != self._watched:
+            self._watched = value
+            self.trigger(self.watch_reason)
+
+    def _run(self):
+        next_poll = time.monotonic() + self.poll_interval
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                deadlines = [t for t in (self._due, next_poll if self.watch else None) if t is not None]
+                if not deadlines or min(deadlines) > now:
+                    # Woken early by trigger(), which may have moved the run
+                    self._cond.wait(min(deadlines) - now if deadlines else None)
+                    continue
+                reasons = None
+                if self._due is not None and self._due <= now:
+                    reasons, self._reasons, self._due = self._reasons, {}, None
+
+            if reasons is None:
+                # Outside the lock, trigger() takes it again
+                self._poll()
+                next_poll = time.monotonic() + self.poll_interval
+                continue
+
+            start = time.perf_counter()
+            failed = False
+            try:
+                self.job()
+            except Exception as e:
+                failed = True
+                print(f"Prefetch after {', '.join(reasons)} changed failed: {e}")
+            with self._cond:
+                self.stats["runs"] += 1
+                self.stats["failures"] += failed
+                self.stats["last_run_seconds"] = round(time.perf_counter() - start, 3)
+
+    def snapshot_stats(self) -> Dict:
+        with self._cond:
+            return {**self.stats, "pending": self._due is not None}
@@ -0,0 +1,123 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from catalog import FLYER_STORES, GroceryCatalog
+from fuzzy_match import CONTAINMENT_THRESHOLD, FuzzyMatcher
+
+# Distinct ingredient names whose per-store prices are remembered between catalog reloads
+MAX_MEMO_ENTRIES = 4096
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def parse_price(price) -> Optional[float]:
+    """Turn flyer prices like '3.49', '2/9.00' or '2.99/100g' into a unit price"""
+    text = str(price).strip()
+    multi = re.match(r"^(\d+)\s*/\s*(\d+(?:\.\d+)?)$", text)
+    if multi:
+        return float(multi.group(2)) / int(multi.group(1))
+    single = re.match(r"^(\d+(?:\.\d+)?)", text)
+    if single:
+        return float(single.group(1))
+    return None
+
+
+class PriceIndex:
+    """Loaded-once price lookup over the store flyers in a GroceryCatalog.
+
+    Flyer item names are vectorized once into a FuzzyMatcher, so a batch of
+    ingredient names is matched against every store with one matrix product and
+    "egg" no longer prices as "eggplant". The index is rebuilt whenever the
+    catalog reloads a store file.
+    """
+
+    def __init__(self, catalog: GroceryCatalog, stores: List[str] = FLYER_STORES,
+                 threshold: float = CONTAINMENT_THRESHOLD, max_memo_entries: int = MAX_MEMO_ENTRIES):
+        self.catalog = catalog
+        self.stores = stores
+        self.threshold = threshold
+        self.max_memo_entries = max_memo_entries
+        self._lock = threading.Lock()
+        self._version = None
+        self._matcher = FuzzyMatcher([])
+        self._prices = np.zeros(0)
+        self._store_array = np.zeros(0, dtype=np.intp)
+        self._memo: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def _build(self, snapshot):
+        names, prices, store_positions = [], [], []
+        for store_position, store in enumerate(self.stores):
+            data = snapshot.store(store)
+            if data is None:
+                continue
+            for name, price in data.items:
+                value = parse_price(price)
+                if value is None:
+                    continue
+                names.append(normalize_name(name))
+                prices.append(value)
+                store_positions.append(store_position)
+        return FuzzyMatcher(names), np.array(prices, dtype=float), np.array(store_positions, dtype=np.intp)
+
+    def refresh(self):
+        """Rebuild the index if the catalog picked up a changed store file"""
+        snapshot = self.catalog.snapshot()
+        if snapshot.version == self._version:
+            return
+        with self._lock:
+            if snapshot.version == self._version:
+                return
+            matcher, prices, store_array = self._build(snapshot)
+            # Swap everything at once so concurrent readers never see a half-built index
+            self._matcher, self._prices, self._store_array, self._memo = matcher, prices, store_array, OrderedDict()
+            self._version = snapshot.version
+
+    def _store_rows(self, queries: List[str]) -> np.ndarray:
+        """Price of the best matching item of every store for each query, inf where a store has none"""
+        matcher, prices, store_array, memo = self._matcher, self._prices, self._store_array, self._memo
+        rows_by_query = {}
+        with self._lock:
+            for query in dict.fromkeys(queries):
+                row = memo.get(query)
+                if row is not None:
+                    memo.move_to_end(query)
+                    rows_by_query[query] = row
+        missing = [query for query in dict.fromkeys(queries) if query not in rows_by_query]
+        if missing:
+            rows = np.full((len(missing), len(self.stores)), np.inf)
+            if len(prices):
+                cosine, containment = matcher.similarity(missing)
+                ranked = np.where(containment >= self.threshold, cosine, -1.0)
+                for store_position in range(len(self.stores)):
+                    # Only this store's items compete, so every store gets its own closest item
+                    in_store = np.where(store_array == store_position, ranked, -1.0)
+                    best = np.argmax(in_store, axis=1)
+                    found = in_store[np.arange(len(missing)), best] >= 0
+                    rows[found, store_position] = prices[best[found]]
+            rows_by_query.update(zip(missing, rows))
+            with self._lock:
+                memo.update(zip(missing, rows))
+                while len(memo) > self.max_memo_entries:
+                    memo.popitem(last=False)
+        return np.vstack([rows_by_query[query] for query in queries])
+
+    def _best_prices(self, queries: List[str]) -> List[float]:
+        matcher, prices = self._matcher, self._prices
+        return [float(prices[index]) if index is not None else 0.0 for index in matcher.match(queries, self.threshold)]
+
+    def get_price(self, item: str) -> float:
+        self.refresh()
+        return self._best_prices([normalize_name(item)])[0]
+
+    def store_prices(self, items: List[str]) -> np.ndarray:
+        """(items x stores) matrix of the closest matching flyer price, inf where a store has none"""
+        self.refresh()
+        if not items:
+            return np.zeros((0, len(self.stores)))
+        return self._store_rows([normalize_name(item) for item in items])
@@ -0,0 +1,203 @@
+import contextvars
+import datetime
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import requests
+
+# Spoonacular's free plan; set SPOONACULAR_DAILY_POINTS for paid plans
+DAILY_POINTS = 150
+# Share of the daily budget background work may not touch, so prefetching never starves users
+BACKGROUND_RESERVE = 0.3
+# Most of the daily budget one owner (a lobby) may spend
+OWNER_SHARE = 0.25
+MAX_CONCURRENT_CALLS = 6
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("quota_priority", default=INTERACTIVE)
+
+# Extra points per returned recipe for each complexSearch option that is turned on
+COMPLEX_SEARCH_OPTION_COST = {
+    "addRecipeInformation": 0.025,
+    "fillIngredients": 0.025,
+    "addRecipeNutrition": 0.025,
+    "addRecipeInstructions": 0.025,
+}
+
+
+class QuotaExceeded(requests.exceptions.RequestException):
+    """Raised instead of calling Spoonacular when the call would overspend the budget"""
+
+
+@contextmanager
+def background():
+    """Spoonacular calls made inside this block are background work (prefetching)"""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    """INTERACTIVE, or BACKGROUND inside a background() block"""
+    return _priority.get()
+
+
+def _truthy(value) -> bool:
+    return value is True or str(value).lower() == "true"
+
+
+def estimate_cost(endpoint: str, params: Dict) -> float:
+    """Points a Spoonacular call will be charged, from its endpoint and params.
+
+    Follows the published price list; the X-API-Quota-* headers of the answer
+    correct the running total afterwards.
+    """
+    number = int(params.get("number") or 10)
+    if endpoint == "findByIngredients":
+        return 1 + 0.01 * number
+    if endpoint == "complexSearch":
+        per_result = 0.01 + sum(cost for option, cost in COMPLEX_SEARCH_OPTION_COST.items()
+                                if _truthy(params.get(option)))
+        return 1 + per_result * number
+    if endpoint == "informationBulk":
+        ids = [i for i in str(params.get("ids", "")).split(",") if i.strip()]
+        cost = 1 + 0.5 * max(len(ids) - 1, 0)
+        if _truthy(params.get("includeNutrition")):
+            cost += 0.025 * len(ids)
+        return cost
+    return 1.0
+
+
+def _today() -> datetime.date:
+    # Spoonacular quotas reset at midnight UTC
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def seconds_until_reset() -> int:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time(),
+                                         tzinfo=datetime.timezone.utc)
+    return int((midnight - now).total_seconds()) + 1
+
+
+class QuotaScheduler:
+    """Daily Spoonacular point budget shared by every route.
+
+    Each outbound call asks for its estimated cost first. Interactive calls may
+    spend down to zero, background calls stop at the reserve, and no owner may
+    spend more than owner_share of the day. Admitted calls then wait for one of
+    max_concurrent slots, background ones only when no interactive call is
+    waiting. The remaining budget follows the X-API-Quota-Used/-Left headers of
+    every answer, and a 402 means the upstream quota is gone for the day.
+    """
+
+    def __init__(self, daily_points: float = DAILY_POINTS, background_reserve: float = BACKGROUND_RESERVE,
+                 owner_share: float = OWNER_SHARE, max_concurrent: int = MAX_CONCURRENT_CALLS):
+        self.daily_points = daily_points
+        self.background_reserve = background_reserve
+        self.owner_share = owner_share
+        self.max_concurrent = max_concurrent
+        self._cond = threading.Condition()
+        self._day = _today()
+        self._used = 0.0
+        self._reserved = 0.0
+        self._by_owner: Dict[str, float] = {}
+        self._active = 0
+        self._waiting_interactive = 0
+        self.stats = {"admitted": 0, "denied_interactive": 0, "denied_background": 0, "denied_owner": 0,
+                      "fallbacks": 0}
+
+    def _rollover(self):
+        # Caller holds self._cond
+        today = _today()
+        if today != self._day:
+            self._day, self._used, self._by_owner = today, 0.0, {}
+
+    def remaining(self) -> float:
+        with self._cond:
+            self._rollover()
+            return self.daily_points - self._used - self._reserved
+
+    def _admit(self, cost: float, priority: int, owner: Optional[str]):
+        # Caller holds self._cond
+        self._rollover()
+        left = self.daily_points - self._used - self._reserved
+        floor = self.background_reserve * self.daily_points if priority == BACKGROUND else 0.0
+        if left - cost < floor:
+            self.stats["denied_background" if priority == BACKGROUND else "denied_interactive"] += 1
+            reserve = f", {floor:.2f} kept for interactive calls" if floor else ""
+            raise QuotaExceeded(f"Spoonacular budget too low ({left:.2f} points left{reserve}, call needs {cost:.2f})")
+        if owner is not None and self._by_owner.get(owner, 0.0) + cost > self.owner_share * self.daily_points:
+            self.stats["denied_owner"] += 1
+            raise QuotaExceeded(f"{owner} has used its share of today's Spoonacular budget")
+        self._reserved += cost
+        self.stats["admitted"] += 1
+
+    @contextmanager
+    def spend(self, cost: float, owner: Optional[str] = None):
+        """Admit one call, hold a slot while it runs; yields a callback for the upstream response"""
+        priority = _priority.get()
+        with self._cond:
+            self._admit(cost, priority, owner)
+            if priority == INTERACTIVE:
+                self._waiting_interactive += 1
+            try:
+                while self._active >= self.max_concurrent or (priority == BACKGROUND and self._waiting_interactive):
+                    self._cond.wait()
+            finally:
+                if priority == INTERACTIVE:
+                    self._waiting_interactive -= 1
+            self._active += 1
+
+        def record(response: requests.Response):
+            with self._cond:
+                self._charge(response, cost, owner)
+
+        try:
+            yield record
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._reserved -= cost
+                self._cond.notify_all()
+
+    def _charge(self, response: requests.Response, cost: float, owner: Optional[str]):
+        # Caller holds self._cond
+        self._rollover()
+        if response.status_code == 402:
+            self._used = self.daily_points
+            return
+        try:
+            points = float(response.headers.get("X-API-Quota-Request", cost))
+        except ValueError:
+            points = cost
+        if owner is not None:
+            self._by_owner[owner] = self._by_owner.get(owner, 0.0) + points
+        try:
+            # Absolute figures for the day, they also reveal the plan's actual limit
+            used = float(response.headers["X-API-Quota-Used"])
+            self.daily_points = used + float(response.headers["X-API-Quota-Left"])
+            self._used = used
+        except (KeyError, ValueError):
+            self._used += points
+
+    def record_fallback(self):
+        with self._cond:
+            self.stats["fallbacks"] += 1
+
+    def snapshot_stats(self) -> Dict:
+        with self._cond:
+            self._rollover()
+            return {
+                **self.stats,
+                "daily_points": self.daily_points,
+                "used_points": round(self._used, 3),
+                "reserved_points": round(self._reserved, 3),
+                "remaining_points": round(self.daily_points - self._used - self._reserved, 3),
+                "active_calls": self._active,
+            }
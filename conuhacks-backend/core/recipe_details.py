@@ -0,0 +1,115 @@
+import contextvars
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class RecipeDetailBatcher:
+    """Merges per-recipe detail lookups into informationBulk calls.
+
+    Lookups for IDs that are not in the local detail cache are queued; the first
+    one starts a short timer, and when it fires every ID queued in the meantime is
+    fetched with a single bulk call. Fetched details are kept in an LRU keyed by ID.
+    """
+
+    def __init__(self, fetch_bulk: Callable[[List[int]], List[Dict]], window: float = 0.05,
+                 max_batch: int = 50, max_cached: int = 1000):
+        self.fetch_bulk = fetch_bulk
+        self.window = window
+        self.max_batch = max_batch
+        self.max_cached = max_cached
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._details: "OrderedDict[int, str]" = OrderedDict()
+        self.stats = {"cache_hits": 0, "batched_ids": 0, "bulk_calls": 0}
+
+    def _cached(self, recipe_id: int) -> Optional[Dict]:
+        body = self._details.get(recipe_id)
+        if body is None:
+            return None
+        self._details.move_to_end(recipe_id)
+        return json.loads(body)
+
+    def remember(self, details: Iterable[Dict]):
+        with self._lock:
+            for detail in details:
+                if isinstance(detail, dict) and "id" in detail:
+                    self._details[detail["id"]] = json.dumps(detail)
+                    self._details.move_to_end(detail["id"])
+            while len(self._details) > self.max_cached:
+                self._details.popitem(last=False)
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending, self._timer = self._pending, {}, None
+
+        ids = list(pending)
+        for start in range(0, len(ids), self.max_batch):
+            chunk = ids[start:start + self.max_batch]
+            with self._lock:
+                self.stats["bulk_calls"] += 1
+            try:
+                details = self.fetch_bulk(chunk)
+            except Exception as e:
+                for recipe_id in chunk:
+                    pending[recipe_id].set_exception(e)
+                continue
+
+            self.remember(details)
+            by_id = {detail.get("id"): detail for detail in details if isinstance(detail, dict)}
+            for recipe_id in chunk:
+                pending[recipe_id].set_result(by_id.get(recipe_id))
+
+    def _submit(self, recipe_id: int) -> Future:
+        # Caller holds self._lock
+        future = self._pending.get(recipe_id)
+        if future is None:
+            future = self._pending[recipe_id] = Future()
+            self.stats["batched_ids"] += 1
+        if self._timer is None:
+            # The batch runs in the context of the lookup that opened it, so its call is metered
+            # against that request's route and quota priority rather than as background work
+            self._timer = threading.Timer(self.window, contextvars.copy_context().run, args=(self._flush,))
+            self._timer.daemon = True
+            self._timer.start()
+        return future
+
+    def get_many(self, recipe_ids: Iterable[int]) -> Dict[int, Optional[Dict]]:
+        """Return details for each ID (None for IDs Spoonacular doesn't know)"""
+        results, futures = {}, {}
+        with self._lock:
+            for recipe_id in recipe_ids:
+                cached = self._cached(recipe_id)
+                if cached is not None:
+                    self.stats["cache_hits"] += 1
+                    results[recipe_id] = cached
+                else:
+                    futures[recipe_id] = self._submit(recipe_id)
+
+        for recipe_id, future in futures.items():
+            detail = future.result()
+            results[recipe_id] = json.loads(json.dumps(detail)) if detail is not None else None
+        return results
+
+    def warm(self, recipe_ids: Iterable[int]) -> int:
+        """Fetch the uncached IDs on the calling thread, bypassing the batch timer; returns how many"""
+        with self._lock:
+            missing = [recipe_id for recipe_id in dict.fromkeys(recipe_ids) if recipe_id not in self._details]
+        for start in range(0, len(missing), self.max_batch):
+            chunk = missing[start:start + self.max_batch]
+            with self._lock:
+                self.stats["bulk_calls"] += 1
+            self.remember(self.fetch_bulk(chunk))
+        return len(missing)
+
+    def get(self, recipe_id: int) -> Optional[Dict]:
+        return self.get_many([recipe_id])[recipe_id]
+
+    def snapshot_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["cached_details"] = len(self._details)
+        return stats
@@ -0,0 +1,148 @@
+import contextvars
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List
+
+from quota import BACKGROUND, current_priority
+
+# Ingredients per findByIngredients call; keeps each query URL short and its cache key stable
+CHUNK_SIZE = 30
+MAX_CONCURRENT_QUERIES = 4
+# Prefetching runs its chunks on a pool of its own, so user requests never queue behind it
+MAX_BACKGROUND_QUERIES = 1
+# Ingredients asked for per source, and chunks per request: every chunk costs at least a
+# Spoonacular point, and with one round of pool slots the slowest single call bounds latency
+MAX_PER_SOURCE = CHUNK_SIZE
+MAX_CHUNKS = MAX_CONCURRENT_QUERIES
+
+
+def ingredient_key(ingredient: Dict):
+    return ingredient.get("id") or (ingredient.get("name") or "").lower()
+
+
+def _union(*lists: Iterable[Dict], exclude=frozenset()) -> List[Dict]:
+    seen, merged = set(exclude), []
+    for ingredients in lists:
+        for ingredient in ingredients:
+            key = ingredient_key(ingredient)
+            if key not in seen:
+                seen.add(key)
+                merged.append(ingredient)
+    return merged
+
+
+def merge_ranked(result_lists: Iterable[List[Dict]], number: int) -> List[Dict]:
+    """Merge findByIngredients answers for disjoint ingredient chunks into one ranking.
+
+    A recipe returned by several chunks uses the union of what each chunk
+    matched; an ingredient is missed only when no chunk matched it. The result
+    is ranked like ranking=1: most used ingredients first, then fewest missed.
+    """
+    merged: Dict[int, Dict] = {}
+    missed: Dict[int, List[List[Dict]]] = {}
+    unused: Dict[int, List[List[Dict]]] = {}
+    for recipes in result_lists:
+        for recipe in recipes:
+            if not isinstance(recipe, dict) or "id" not in recipe:
+                continue
+            recipe_id = recipe["id"]
+            current = merged.get(recipe_id)
+            if current is None:
+                merged[recipe_id] = current = {**recipe, "usedIngredients": []}
+            current["usedIngredients"] = _union(current["usedIngredients"], recipe.get("usedIngredients") or [])
+            missed.setdefault(recipe_id, []).append(recipe.get("missedIngredients") or [])
+            unused.setdefault(recipe_id, []).append(recipe.get("unusedIngredients") or [])
+
+    for recipe_id, recipe in merged.items():
+        used = {ingredient_key(ingredient) for ingredient in recipe["usedIngredients"]}
+        recipe["missedIngredients"] = _union(*missed[recipe_id], exclude=used)
+        recipe["unusedIngredients"] = _union(*unused[recipe_id])
+        recipe["usedIngredientCount"] = len(recipe["usedIngredients"])
+        recipe["missedIngredientCount"] = len(recipe["missedIngredients"])
+
+    # dicts keep insertion order, so ties go to the recipe an earlier chunk ranked first
+    ranked = sorted(merged.values(), key=lambda r: (-r["usedIngredientCount"], r["missedIngredientCount"]))
+    return ranked[:number]
+
+
+class IngredientFanout:
+    """Runs one large findByIngredients query as concurrent per-store chunks.
+
+    Each source (the fridge, one store's discounts, ...) is cut to its
+    max_per_source most useful ingredients and split into chunks of chunk_size;
+    at most max_chunks chunks are queried per request, on a shared pool capped
+    at max_workers, so latency follows the slowest single call rather than the
+    size of the combined query. Answers are merged and re-ranked with
+    merge_ranked. A chunk that fails is left out; the call only fails when every
+    chunk does. Background work (see quota.background) gets its own smaller pool.
+    """
+
+    def __init__(self, fetch: Callable[[List[str], int], List[Dict]], max_workers: int = MAX_CONCURRENT_QUERIES,
+                 chunk_size: int = CHUNK_SIZE, max_per_source: int = MAX_PER_SOURCE, max_chunks: int = MAX_CHUNKS,
+                 background_workers: int = MAX_BACKGROUND_QUERIES):
+        self.fetch = fetch
+        self.chunk_size = chunk_size
+        self.max_per_source = max_per_source
+        self.max_chunks = max_chunks
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="find-by-ingredients")
+        self._background_executor = ThreadPoolExecutor(max_workers=background_workers,
+                                                       thread_name_prefix="find-by-ingredients-background")
+        self._lock = threading.Lock()
+        self.stats = {"queries": 0, "chunks": 0, "failed_chunks": 0, "dropped_ingredients": 0}
+
+    def chunks(self, sources: Dict[str, List[str]]) -> List[List[str]]:
+        """Ingredient chunks per source, each ingredient asked for once.
+
+        Ingredients several sources share (on sale at two stores, already in the
+        fridge) rank first within a source, the source's own order breaks ties,
+        and only what fits under the caps is kept.
+        """
+        keyed = []
+        for names in sources.values():
+            unique: Dict[str, str] = {}
+            for name in names:
+                key = name.strip().lower()
+                if key and key not in unique:
+                    unique[key] = name.strip()
+            keyed.append(unique)
+        shared = Counter(key for unique in keyed for key in unique)
+
+        seen, chunks = set(), []
+        for unique in keyed:
+            ranked = sorted((key for key in unique if key not in seen), key=lambda key: -shared[key])
+            kept = ranked[:self.max_per_source]
+            seen.update(kept)
+            names = [unique[key] for key in kept]
+            chunks.extend(names[start:start + self.chunk_size] for start in range(0, len(names), self.chunk_size))
+        kept_chunks = chunks[:self.max_chunks]
+        with self._lock:
+            self.stats["dropped_ingredients"] += len(shared) - sum(len(chunk) for chunk in kept_chunks)
+        return kept_chunks
+
+    def find(self, sources: Dict[str, List[str]], number: int) -> List[Dict]:
+        chunks = self.chunks(sources)
+        executor = self._background_executor if current_priority() == BACKGROUND else self._executor
+        # Each task runs in a copy of the caller's context so metrics stay attributed to its route
+        futures = [executor.submit(contextvars.copy_context().run, self.fetch, chunk, number)
+                   for chunk in chunks]
+
+        results, errors = [], []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            print(f"findByIngredients: {len(errors)} of {len(chunks)} chunks failed, first: {errors[0]}")
+        with self._lock:
+            self.stats["queries"] += 1
+            self.stats["chunks"] += len(chunks)
+            self.stats["failed_chunks"] += len(errors)
+        if errors and not results:
+            raise errors[0]
+        return merge_ranked(results, number)
+
+    def snapshot_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
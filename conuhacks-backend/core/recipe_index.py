@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+INGREDIENT_IMAGE_URL = "https://img.spoonacular.com/ingredients_100x100/"
+
+# Staples Spoonacular skips when ignorePantry=true
+PANTRY_INGREDIENTS = {"water", "salt", "ice", "flour", "sugar"}
+
+
+def normalize_ingredient(name: str) -> str:
+    return " ".join(name.lower().replace(",", " ").split())
+
+
+class RecipeIndex:
+    """Local ingredient -> recipe inverted index answering findByIngredients offline.
+
+    Recipes come from recipes.json, cached recipe details and any upstream
+    findByIngredients answer passed to add_recipes. A recipe ingredient counts as
+    used when one of the query ingredients matches it word for word (so "banana"
+    covers "ripe banana"). Results are ranked like ranking=1: most used
+    ingredients first, then fewest missed.
+    """
+
+    def __init__(self, recipes_file: Optional[str] = None):
+        self.recipes_file = recipes_file
+        self._lock = threading.Lock()
+        self._recipes_mtime = None
+        self._recipes: Dict[int, Dict] = {}
+        self._ingredients: Dict[int, List[Dict]] = {}
+        # Normalized name and word set of each ingredient, parallel to _ingredients
+        self._names: Dict[int, List[Tuple[str, FrozenSet[str]]]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+    def _index(self, recipe_id: int, summary: Dict, ingredients: List[Dict]):
+        # Caller holds self._lock
+        self._recipes[recipe_id] = summary
+        self._ingredients[recipe_id] = ingredients
+        self._names[recipe_id] = []
+        for ingredient in ingredients:
+            name = normalize_ingredient(ingredient["name"])
+            words = frozenset(name.split())
+            self._names[recipe_id].append((name, words))
+            for word in words:
+                self._postings.setdefault(word, set()).add(recipe_id)
+
+    def add_recipes(self, recipes: Iterable[Dict]):
+        """Index findByIngredients results (used + missed ingredients)"""
+        with self._lock:
+            for recipe in recipes:
+                if not isinstance(recipe, dict) or "id" not in recipe:
+                    continue
+                ingredients = recipe.get("usedIngredients", []) + recipe.get("missedIngredients", [])
+                summary = {key: recipe.get(key) for key in ("id", "title", "image", "imageType", "likes")}
+                self._index(recipe["id"], summary, [i for i in ingredients if i.get("name")])
+
+    def add_details(self, details: Iterable[Dict]):
+        """Index recipe information objects (extendedIngredients)"""
+        with self._lock:
+            for detail in details:
+                if not isinstance(detail, dict) or "id" not in detail or detail["id"] in self._recipes:
+                    continue
+                ingredients = []
+                for ingredient in detail.get("extendedIngredients") or []:
+                    if not ingredient.get("name"):
+                        continue
+                    ingredient = dict(ingredient)
+                    if ingredient.get("image") and not ingredient["image"].startswith("http"):
+                        ingredient["image"] = INGREDIENT_IMAGE_URL + ingredient["image"]
+                    ingredients.append(ingredient)
+                summary = {key: detail.get(key) for key in ("id", "title", "image", "imageType")}
+                summary["likes"] = detail.get("aggregateLikes", 0)
+                self._index(detail["id"], summary, ingredients)
+
+    def refresh(self):
+        """Pick up recipes.json again if it was rewritten"""
+        if not self.recipes_file:
+            return
+        try:
+            mtime = os.stat(self.recipes_file).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._recipes_mtime:
+            return
+        try:
+            with open(self.recipes_file, "r") as f:
+                recipes = json.load(f).get("results", [])
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Could not index {self.recipes_file}: {e}")
+            return
+        self.add_recipes(recipes)
+        self._recipes_mtime = mtime
+
+    def find_by_ingredients(self, ingredients: Iterable[str], number: int = 10,
+                            ignore_pantry: bool = True) -> List[Dict]:
+        self.refresh()
+        query = {normalize_ingredient(name) for name in ingredients if name and name.strip()}
+        query = {name for name in query if name}
+        words = {word for name in query for word in name.split()}
+        # Each query ingredient filed under one of its words: a query covers an
+        # ingredient only if all its words are in the name, so only the query
+        # sets filed under the name's own words need checking
+        query_sets: Dict[str, List[FrozenSet[str]]] = {}
+        for name in query:
+            name_words = frozenset(name.split())
+            query_sets.setdefault(min(name_words), []).append(name_words)
+
+        with self._lock:
+            candidates = set()
+            for word in words:
+                candidates |= self._postings.get(word, set())
+
+            scored = []
+            for recipe_id in candidates:
+                used, missed = [], []
+                for ingredient, (name, name_words) in zip(self._ingredients[recipe_id], self._names[recipe_id]):
+                    if ignore_pantry and name in PANTRY_INGREDIENTS:
+                        continue
+                    if name in query or any(q <= name_words for word in name_words for q in query_sets.get(word, ())):
+                        used.append(ingredient)
+                    else:
+                        missed.append(ingredient)
+                if used:
+                    scored.append((recipe_id, used, missed))
+
+            scored.sort(key=lambda entry: (-len(entry[1]), len(entry[2]), entry[0]))
+            results = []
+            for recipe_id, used, missed in scored[:number]:
+                recipe = dict(self._recipes[recipe_id])
+                recipe.update({
+                    "usedIngredientCount": len(used),
+                    "missedIngredientCount": len(missed),
+                    "usedIngredients": used,
+                    "missedIngredients": missed,
+                    "unusedIngredients": [],
+                })
+                results.append(recipe)
+        # Hand out copies so callers can annotate results freely
+        return json.loads(json.dumps(results))
+
+    def search(self, query: str = "", number: int = 10) -> List[Dict]:
+        """Known recipes whose title has every word of the query, most liked first"""
+        self.refresh()
+        words = normalize_ingredient(query).split()
+        with self._lock:
+            matches = [summary for summary in self._recipes.values()
+                       if all(word in (summary.get("title") or "").lower() for word in words)]
+            matches.sort(key=lambda summary: -(summary.get("likes") or 0))
+            return json.loads(json.dumps(matches[:number]))
+
+    def details(self, recipe_id: int) -> Optional[Dict]:
+        """What the index knows about a recipe, shaped like a (partial) recipe information object"""
+        self.refresh()
+        with self._lock:
+            if recipe_id not in self._recipes:
+                return None
+            detail = dict(self._recipes[recipe_id], extendedIngredients=self._ingredients[recipe_id])
+            return json.loads(json.dumps(detail))
+
+    def __len__(self) -> int:
+        return len(self._recipes)
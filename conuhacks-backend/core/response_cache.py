@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Params that never change the answer and must not end up in cache keys
+SECRET_PARAMS = {"apiKey", "key"}
+# Comma-separated list params whose order does not matter upstream
+LIST_PARAMS = {"ingredients", "ids", "intolerances", "includeIngredients"}
+
+
+def canonical_params(params: Dict) -> Dict[str, str]:
+    canonical = {}
+    for name, value in params.items():
+        if name in SECRET_PARAMS or value is None or value == "" or value == []:
+            continue
+        if name in LIST_PARAMS:
+            parts = value if isinstance(value, (list, tuple)) else str(value).split(",")
+            parts = sorted({str(part).strip().lower() for part in parts if str(part).strip()})
+            if not parts:
+                continue
+            value = ",".join(parts)
+        elif isinstance(value, bool):
+            value = "true" if value else "false"
+        canonical[name] = str(value)
+    return dict(sorted(canonical.items()))
+
+
+def cache_key(url: str, params: Dict) -> str:
+    raw = json.dumps([url, canonical_params(params)], separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response cache with a bounded in-memory LRU in front.
+
+    Entries expire after the TTL given when they are stored, but stay on disk for
+    another stale_for seconds as a last resort (get_stale_body) when a fresh
+    answer can't be fetched. When the on-disk payloads grow past max_disk_bytes,
+    the least recently used rows are dropped.
+    """
+
+    def __init__(self, path: str, max_memory_entries: int = 256, max_disk_bytes: int = 50 * 1024 * 1024,
+                 stale_for: float = 7 * 24 * 60 * 60):
+        self.path = path
+        self.stale_for = stale_for
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "stale_hits": 0}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                body TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._db.commit()
+
+    def _remember(self, key: str, body: str, expires_at: float):
+        # Bodies are kept serialized so callers can freely mutate what they get back
+        self._memory[key] = (body, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_body(self, key: str) -> Optional[str]:
+        """The cached body still serialized, for responses that pass it through as is"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[1] > now:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[0]
+            self._memory.pop(key, None)
+
+            row = self._db.execute(
+                "SELECT body, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.stats["misses"] += 1
+                return None
+
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._remember(key, row[0], row[1])
+            self.stats["disk_hits"] += 1
+            return row[0]
+
+    def get_stale_body(self, key: str) -> Optional[str]:
+        """The cached body even if it has expired, as long as it is still kept"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry:
+                self.stats["stale_hits"] += 1
+                return entry[0]
+            row = self._db.execute(
+                "SELECT body FROM responses WHERE key = ? AND expires_at > ?", (key, time.time() - self.stale_for)
+            ).fetchone()
+            if row is not None:
+                self.stats["stale_hits"] += 1
+            return row[0] if row else None
+
+    def get(self, key: str) -> Optional[Any]:
+        body = self.get_body(key)
+        return json.loads(body) if body is not None else None
+
+    def set(self, key: str, endpoint: str, value: Any, ttl: float) -> str:
+        """Store a value; returns its serialized body"""
+        now = time.time()
+        body = json.dumps(value)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, body, len(body), now + ttl, now),
+            )
+            self._evict(now)
+            self._db.commit()
+            self._remember(key, body, now + ttl)
+        return body
+
+    def _evict(self, now: float):
+        self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now - self.stale_for,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        for key, size in self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            total -= size
+            self.stats["evictions"] += 1
+
+    def snapshot_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"], stats["disk_bytes"] = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
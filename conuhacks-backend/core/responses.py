@@ -0,0 +1,168 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Union
+
+from flask import Flask, Response, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Bodies smaller than this go out uncompressed, the headers would eat the gain
+MIN_COMPRESS_BYTES = 1024
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/plain", "text/html", "text/csv"}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def etag_for(body: Union[str, bytes]) -> str:
+    """Strong ETag of a serialized body"""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _base_tag(tag: str) -> str:
+    # Compressed representations carry "-gzip" / "-br" on top of the body's tag
+    for encoding in ("gzip", "br"):
+        if tag.endswith(f"-{encoding}"):
+            return tag[:-len(encoding) - 1]
+    return tag
+
+
+def not_modified(etag: str) -> bool:
+    """Whether the client's If-None-Match already names this body"""
+    tags = request.if_none_match
+    if not tags:
+        return False
+    return tags.star_tag or any(_base_tag(tag) == etag for tag in tags.as_set(include_weak=True))
+
+
+def json_body_response(body: Union[str, bytes], etag: Optional[str] = None) -> Response:
+    """Response for an already serialized JSON body; a 304 when the client has it"""
+    etag = etag or etag_for(body)
+    if not_modified(etag):
+        compressor.record_not_modified()
+        response = Response(status=304)
+        response.headers.pop("Content-Type", None)
+    else:
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    return response
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify / request.get_json backed by orjson"""
+
+    # Key order is already stable in our payloads; sorting costs more than it's worth
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs) -> str:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+class Compressor:
+    """Strong ETags, If-None-Match revalidation and gzip/brotli for large bodies.
+
+    Every 200 JSON answer to a GET gets an ETag (routes that know their version
+    set one themselves), and a matching If-None-Match turns into an empty 304.
+    Bodies over min_size are compressed with the best encoding the client
+    accepts; compressed bodies are kept in a small LRU keyed by ETag, so a
+    payload served repeatedly is compressed once.
+    """
+
+    def __init__(self, min_size: int = MIN_COMPRESS_BYTES, max_cached: int = 64):
+        self.min_size = min_size
+        self.max_cached = max_cached
+        self.encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+        self._cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"not_modified": 0, "compressed": 0, "compress_cache_hits": 0, "bytes_saved": 0}
+
+    def init_app(self, app: Flask):
+        if orjson is not None:
+            app.json = FastJSONProvider(app)
+        app.after_request(self.process)
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+    def _compressed(self, etag: str, body: bytes, encoding: str) -> bytes:
+        key = (etag, encoding)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats["compress_cache_hits"] += 1
+                return cached
+        compressed = self._compress(body, encoding)
+        with self._lock:
+            self._cache[key] = compressed
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return compressed
+
+    def record_not_modified(self):
+        with self._lock:
+            self.stats["not_modified"] += 1
+
+    def process(self, response: Response) -> Response:
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        body = response.get_data()
+        etag, _ = response.get_etag()
+        if request.method == "GET" and response.mimetype == "application/json":
+            if etag is None:
+                etag = etag_for(body)
+                response.set_etag(etag)
+            if not_modified(etag):
+                self.record_not_modified()
+                response.status_code = 304
+                response.set_data(b"")
+                response.headers.pop("Content-Type", None)
+                return response
+
+        response.vary.add("Accept-Encoding")
+        if len(body) < self.min_size:
+            return response
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        compressed = self._compressed(etag, body, encoding) if etag else self._compress(body, encoding)
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            response.set_etag(f"{etag}-{encoding}")
+        with self._lock:
+            self.stats["compressed"] += 1
+            self.stats["bytes_saved"] += len(body) - len(compressed)
+        return response
+
+    def snapshot_stats(self):
+        with self._lock:
+            return {**self.stats, "cached_bodies": len(self._cache)}
+
+
+compressor = Compressor()
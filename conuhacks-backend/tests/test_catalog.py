@@ -0,0 +1,56 @@
+import json
+import os
+
+from catalog import GroceryCatalog
+
+FILES = {"iga": "iga.json", "metro": "metro.json"}
+
+
+def write_flyer(path, items, mtime_ns):
+    path.write_text(json.dumps({"categories": {"produce": items}}), encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_snapshot_is_reused_until_a_file_changes(tmp_path):
+    write_flyer(tmp_path / "iga.json", {"apples": "3.99"}, 1_000_000_000)
+    catalog = GroceryCatalog(str(tmp_path), FILES)
+
+    snapshot = catalog.snapshot()
+    assert catalog.names("iga") == ["apples"]
+    assert catalog.store("metro") is None
+    assert catalog.snapshot() is snapshot
+
+    write_flyer(tmp_path / "iga.json", {"pears": "2.49"}, 2_000_000_000)
+    reloaded = catalog.snapshot()
+    assert reloaded.version == snapshot.version + 1
+    assert catalog.items_with_price("iga") == [{"name": "pears", "price": "2.49"}]
+
+
+def test_unchanged_stores_are_not_reparsed(tmp_path):
+    write_flyer(tmp_path / "iga.json", {"apples": "3.99"}, 1_000_000_000)
+    catalog = GroceryCatalog(str(tmp_path), FILES)
+    iga = catalog.store("iga")
+
+    write_flyer(tmp_path / "metro.json", {"milk": "4.99"}, 1_000_000_000)
+    assert catalog.store("iga") is iga
+    assert catalog.names("metro") == ["milk"]
+
+
+def test_broken_file_keeps_the_last_good_copy(tmp_path):
+    write_flyer(tmp_path / "iga.json", {"apples": "3.99"}, 1_000_000_000)
+    catalog = GroceryCatalog(str(tmp_path), FILES)
+    etag = catalog.snapshot().groceries_etag
+
+    (tmp_path / "iga.json").write_text("{not json", encoding="utf-8")
+    os.utime(tmp_path / "iga.json", ns=(2_000_000_000, 2_000_000_000))
+    assert catalog.names("iga") == ["apples"]
+    assert catalog.snapshot().groceries_etag == etag
+
+
+def test_deleted_file_drops_its_store(tmp_path):
+    write_flyer(tmp_path / "iga.json", {"apples": "3.99"}, 1_000_000_000)
+    catalog = GroceryCatalog(str(tmp_path), FILES)
+    assert catalog.names("iga") == ["apples"]
+
+    os.remove(tmp_path / "iga.json")
+    assert catalog.store("iga") is None
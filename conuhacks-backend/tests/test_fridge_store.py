@@ -0,0 +1,60 @@
+from fridge_store import FridgeStore, merge_quantities
+
+
+def make_store(tmp_path, csv_text=None):
+    legacy = None
+    if csv_text is not None:
+        legacy = tmp_path / "fridge.txt"
+        legacy.write_text(csv_text, encoding="utf-8")
+    return FridgeStore(str(tmp_path / "store" / "fridge.sqlite3"), str(legacy) if legacy else None)
+
+
+def test_merge_quantities_sums_numbers():
+    assert merge_quantities("2", "3") == "5"
+    assert merge_quantities("1.5", "1") == "2.5"
+
+
+def test_merge_quantities_keeps_both_when_not_numeric():
+    assert merge_quantities("2 cups", "1") == "2 cups + 1"
+    assert merge_quantities("", "1 bunch") == "1 bunch"
+
+
+def test_add_merges_same_name_and_plurals(tmp_path):
+    store = make_store(tmp_path)
+    store.add("Tomato", 2)
+    store.add("  tomato ", 1)
+    store.add("Tomatoes", "4")
+
+    items = store.items()
+    assert [item["name"] for item in items] == ["tomato"]
+    assert items[0]["quantity"] == "7"
+    assert store.get("TOMATOES")["quantity"] == "7"
+
+
+def test_add_keeps_existing_image(tmp_path):
+    store = make_store(tmp_path)
+    store.add("milk", 1, "/thumbnails/milk.jpg")
+    assert store.add("milk", 1, "/thumbnails/other.jpg")["imageUrl"] == "/thumbnails/milk.jpg"
+
+
+def test_legacy_csv_is_merged_once(tmp_path):
+    csv_text = "name,quantity,imageUrl\nEggs,6,\neggs,6,\nMilk,1 litre,\n"
+    store = make_store(tmp_path, csv_text)
+    assert {item["name"]: item["quantity"] for item in store.items()} == {"eggs": "12", "milk": "1 litre"}
+
+    # Reopening must not import the file a second time
+    assert make_store(tmp_path, csv_text).get("eggs")["quantity"] == "12"
+
+
+def test_sees_writes_from_another_instance(tmp_path):
+    first = make_store(tmp_path)
+    second = make_store(tmp_path)
+    first.add("carrot", 3)
+    assert second.get("carrots")["quantity"] == "3"
+
+    second.add("carrot", 2)
+    second.delete("nothing")
+    assert first.items() == [{"name": "carrot", "quantity": "5", "imageUrl": ""}]
+
+    first.delete("carrot")
+    assert second.items() == []
@@ -0,0 +1,97 @@
+import pytest
+import requests
+
+import http_client
+from http_client import CircuitBreaker, CircuitOpenError, HttpClient
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(http_client.time, "monotonic", clock)
+    monkeypatch.setattr(http_client.time, "sleep", lambda seconds: None)
+    return clock
+
+
+def response(status):
+    answer = requests.Response()
+    answer.status_code = status
+    return answer
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    assert breaker.allow() and breaker.allow()
+
+
+def test_client_retries_then_fails_fast(clock, monkeypatch):
+    client = HttpClient(max_retries=2)
+    calls = []
+
+    def get(url, params=None, **kwargs):
+        calls.append(url)
+        return response(503)
+
+    monkeypatch.setattr(client.session, "get", get)
+    assert client.get("https://api.example.com/a").status_code == 503
+    assert len(calls) == 3
+
+    # The fifth failure opens the default breaker, so the retry after it never reaches the host
+    with pytest.raises(CircuitOpenError):
+        client.get("https://api.example.com/a")
+    assert client.breaker("api.example.com").state == "open"
+    assert len(calls) == 5
+    with pytest.raises(CircuitOpenError):
+        client.get("https://api.example.com/a")
+    assert len(calls) == 5
+    assert client.breaker("other.example.com").state == "closed"
+
+
+def test_client_reports_every_attempt(clock, monkeypatch):
+    client = HttpClient(max_retries=1)
+    answers = [requests.exceptions.ConnectionError("reset"), response(200)]
+    seen = []
+
+    def get(url, params=None, **kwargs):
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    monkeypatch.setattr(client.session, "get", get)
+    client.observer = lambda host, seconds, status: seen.append((host, status))
+    assert client.get("https://api.example.com/b").status_code == 200
+    assert seen == [("api.example.com", "error"), ("api.example.com", 200)]
+    assert client.breaker("api.example.com").failures == 0
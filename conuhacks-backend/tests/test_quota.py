@@ -0,0 +1,87 @@
+import pytest
+import requests
+
+import quota
+from quota import QuotaExceeded, QuotaScheduler, estimate_cost
+
+
+def response(status=200, **headers):
+    answer = requests.Response()
+    answer.status_code = status
+    answer.headers.update({name.replace("_", "-"): str(value) for name, value in headers.items()})
+    return answer
+
+
+def spend(scheduler, cost, owner=None, answer=None):
+    with scheduler.spend(cost, owner) as record:
+        record(answer if answer is not None else response())
+
+
+def test_estimate_cost_follows_price_list():
+    assert estimate_cost("findByIngredients", {"number": 10}) == pytest.approx(1.1)
+    assert estimate_cost("complexSearch", {"number": 10, "addRecipeInformation": True}) == pytest.approx(1.35)
+    assert estimate_cost("informationBulk", {"ids": "1,2,3"}) == pytest.approx(2.0)
+    assert estimate_cost("other", {}) == 1.0
+
+
+def test_estimates_are_charged_without_headers():
+    scheduler = QuotaScheduler(daily_points=10)
+    spend(scheduler, 2)
+    spend(scheduler, 1.5)
+    stats = scheduler.snapshot_stats()
+    assert stats["used_points"] == 3.5
+    assert stats["reserved_points"] == 0
+    assert stats["admitted"] == 2
+
+
+def test_background_work_stops_at_the_reserve():
+    scheduler = QuotaScheduler(daily_points=10, background_reserve=0.3)
+    with quota.background():
+        spend(scheduler, 6)
+        with pytest.raises(QuotaExceeded):
+            spend(scheduler, 2)
+    spend(scheduler, 4)
+    with pytest.raises(QuotaExceeded):
+        spend(scheduler, 0.5)
+    stats = scheduler.snapshot_stats()
+    assert (stats["denied_background"], stats["denied_interactive"]) == (1, 1)
+
+
+def test_owner_is_capped_at_its_share():
+    scheduler = QuotaScheduler(daily_points=100, owner_share=0.25)
+    spend(scheduler, 20, owner="lobby-a")
+    with pytest.raises(QuotaExceeded):
+        spend(scheduler, 10, owner="lobby-a")
+    spend(scheduler, 10, owner="lobby-b")
+    assert scheduler.snapshot_stats()["denied_owner"] == 1
+
+
+def test_headers_correct_the_running_total():
+    scheduler = QuotaScheduler(daily_points=150)
+    spend(scheduler, 1, answer=response(X_API_Quota_Request=3, X_API_Quota_Used=40, X_API_Quota_Left=460))
+    stats = scheduler.snapshot_stats()
+    assert stats["daily_points"] == 500
+    assert stats["used_points"] == 40
+
+    # The charged points, not the estimate, count against the owner
+    spend(scheduler, 1, owner="lobby", answer=response(X_API_Quota_Request=120))
+    with pytest.raises(QuotaExceeded):
+        spend(scheduler, 10, owner="lobby")
+
+
+def test_payment_required_exhausts_the_day():
+    scheduler = QuotaScheduler(daily_points=150)
+    spend(scheduler, 1, answer=response(402))
+    assert scheduler.remaining() == 0
+    with pytest.raises(QuotaExceeded):
+        spend(scheduler, 1)
+
+
+def test_reservation_is_released_when_the_call_fails():
+    scheduler = QuotaScheduler(daily_points=10)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        with scheduler.spend(3):
+            raise requests.exceptions.ConnectionError("down")
+    stats = scheduler.snapshot_stats()
+    assert stats["reserved_points"] == 0 and stats["active_calls"] == 0
+    assert scheduler.remaining() == 10
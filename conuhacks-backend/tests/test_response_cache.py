@@ -0,0 +1,64 @@
+import response_cache
+from response_cache import ResponseCache, cache_key
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(tmp_path, monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    return ResponseCache(str(tmp_path / "cache" / "responses.sqlite3"), **kwargs), clock
+
+
+def test_cache_key_ignores_secrets_and_list_order():
+    url = "https://api.spoonacular.com/recipes/findByIngredients"
+    assert (cache_key(url, {"ingredients": "Eggs, milk", "apiKey": "a", "number": 5})
+            == cache_key(url, {"number": "5", "ingredients": "milk,eggs", "apiKey": "b"}))
+    assert cache_key(url, {"number": 5}) != cache_key(url, {"number": 6})
+
+
+def test_entries_expire_after_their_ttl(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, stale_for=100)
+    cache.set("k", "findByIngredients", [1, 2], ttl=10)
+    assert cache.get("k") == [1, 2]
+
+    clock.now += 11
+    assert cache.get("k") is None
+    assert cache.get_stale_body("k") == "[1, 2]"
+
+    clock.now += 100
+    cache.set("other", "findByIngredients", [], ttl=10)
+    assert cache.get_stale_body("k") is None
+
+
+def test_memory_lru_falls_back_to_disk(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch, max_memory_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, "informationBulk", key, ttl=60)
+
+    assert cache.get("b") == "b"
+    assert cache.get("a") == "a"
+    stats = cache.snapshot_stats()
+    assert (stats["memory_hits"], stats["disk_hits"]) == (1, 1)
+    assert stats["memory_entries"] == 2
+
+
+def test_disk_drops_least_recently_used_rows(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, max_memory_entries=1, max_disk_bytes=20)
+    cache.set("old", "complexSearch", "x" * 8, ttl=60)
+    clock.now += 1
+    cache.set("used", "complexSearch", "y" * 8, ttl=60)
+    clock.now += 1
+    cache.get("old")
+    clock.now += 1
+    cache.set("new", "complexSearch", "z" * 8, ttl=60)
+
+    assert cache.get("used") is None
+    assert cache.get("old") == "x" * 8
+    assert cache.snapshot_stats()["evictions"] == 1
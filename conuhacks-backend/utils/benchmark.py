@@ -0,0 +1,330 @@
+import argparse
+import csv
+import importlib
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from fake_upstream import FAKE_JPEG, FakeUpstream
+from normalize_results import DEFAULT_OUTPUTS, normalize_results
+
+project_root = Path(__file__).parent.parent
+repo_root = project_root.parent
+
+# Vocabulary for synthetic recipes, fridge rows and flyer items
+FOODS = [
+    'chicken', 'beef', 'pork', 'salmon', 'shrimp', 'tofu', 'rice', 'pasta', 'noodles', 'bread', 'tomato',
+    'onion', 'garlic', 'carrot', 'potato', 'broccoli', 'spinach', 'mushroom', 'pepper', 'cucumber',
+    'apple', 'banana', 'mango', 'lemon', 'orange', 'yogurt', 'milk', 'cheese', 'butter', 'egg',
+    'beans', 'lentils', 'chickpeas', 'oats', 'cereal', 'crackers', 'chips', 'soup', 'sauce', 'honey',
+]
+ADJECTIVES = ['fresh', 'frozen', 'organic', 'smoked', 'whole', 'sliced', 'diced', 'roasted', 'spicy', 'sweet']
+ALLERGIES = ['Nuts', 'Dairy', 'Eggs', 'Shellfish', 'Soy', 'Wheat', 'Fish', 'Sesame']
+DIETS = ['Vegetarian', 'Vegan', 'Gluten-free', 'Kosher', 'Halal', 'Keto', 'Paleo']
+
+
+def synthetic_ingredient(rng: random.Random, ingredient_id: int) -> Dict:
+    name = rng.choice(FOODS)
+    return {"id": ingredient_id, "amount": 1.0, "unit": "", "aisle": "Produce", "name": name,
+            "original": f"1 {name}", "image": f"https://img.spoonacular.com/ingredients_100x100/{name}.jpg"}
+
+
+def synthetic_recipe(rng: random.Random, recipe_id: int) -> Dict:
+    used = [synthetic_ingredient(rng, recipe_id * 10 + i) for i in range(rng.randint(1, 4))]
+    missed = [synthetic_ingredient(rng, recipe_id * 10 + 5 + i) for i in range(rng.randint(0, 4))]
+    return {
+        "id": recipe_id,
+        "title": f"{rng.choice(ADJECTIVES).title()} {used[0]['name']} bowl #{recipe_id}",
+        "image": f"https://img.spoonacular.com/recipes/{recipe_id}-312x231.jpg",
+        "imageType": "jpg",
+        "usedIngredientCount": len(used),
+        "missedIngredientCount": len(missed),
+        "usedIngredients": used,
+        "missedIngredients": missed,
+        "likes": rng.randint(0, 500),
+    }
+
+
+def synthetic_participant(rng: random.Random, index: int) -> Dict:
+    return {
+        "name": f"guest{index}",
+        "email": f"guest{index}@example.com",
+        "allergies": rng.sample(ALLERGIES, rng.randint(0, 2)),
+        "dietaryRestrictions": rng.sample(DIETS, rng.randint(0, 2)),
+    }
+
+
+def write_fixtures(root: Path, args, rng: random.Random) -> Dict:
+    """Lay out BASE_DIR/BACKEND_DIR trees: recorded data plus the requested synthetic rows"""
+    base_dir, backend_dir = root / "base", root / "backend"
+    (base_dir / "store").mkdir(parents=True)
+    (backend_dir / "cache" / "thumbnails").mkdir(parents=True)
+
+    with open(repo_root / "recipes.json", "r", encoding="utf-8") as f:
+        recipes = json.load(f).get("results", [])
+    recipes += [synthetic_recipe(rng, 10_000_000 + i) for i in range(args.recipes)]
+    with open(base_dir / "recipes.json", "w", encoding="utf-8") as f:
+        json.dump({"results": recipes}, f)
+
+    with open(repo_root / "store" / "rooms.json", "r", encoding="utf-8") as f:
+        lobbies = json.load(f)
+    for i in range(args.lobbies):
+        lobbies.append({
+            "lobbyId": f"bench-lobby-{i}", "title": f"Bench lobby {i}", "date": "2025-02-13T05:00:00.000Z",
+            "participants": [synthetic_participant(rng, i * 100 + j) for j in range(args.participants)],
+            "allergies": [], "dietaryRestrictions": [],
+        })
+    with open(base_dir / "store" / "rooms.json", "w", encoding="utf-8") as f:
+        json.dump(lobbies, f)
+
+    with open(project_root / "fridge.txt", "r", encoding="utf-8") as f:
+        fridge_rows = list(csv.DictReader(f))
+    fridge_rows += [
+        {"name": f"{rng.choice(ADJECTIVES)} {rng.choice(FOODS)} {i}", "quantity": str(rng.randint(1, 5)), "imageUrl": ""}
+        for i in range(args.fridge_rows)
+    ]
+    with open(backend_dir / "fridge.txt", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["name", "quantity", "imageUrl"])
+        writer.writeheader()
+        writer.writerows(fridge_rows)
+
+    # Synthetic flyer items are spread over the stores, then normalized like real extraction output
+    raw_files = ["iga_results.json", "metro_results.json", "super_results.json"]
+    for position, raw_name in enumerate(raw_files):
+        with open(project_root / raw_name, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        categories = raw.setdefault("categories", {})
+        for i in range(position, args.catalog_items, len(raw_files)):
+            category = rng.choice(list(categories) or ["pantry"])
+            name = f"Brand{i} {rng.choice(ADJECTIVES)} {rng.choice(FOODS)} ({rng.randint(100, 900)}g)"
+            categories.setdefault(category, {})[name] = f"{rng.uniform(0.99, 19.99):.2f}"
+        with open(backend_dir / raw_name, "w", encoding="utf-8") as f:
+            json.dump(raw, f)
+        if raw_name in DEFAULT_OUTPUTS:
+            with open(backend_dir / DEFAULT_OUTPUTS[raw_name], "w", encoding="utf-8") as f:
+                json.dump(normalize_results(raw), f)
+
+    with open(backend_dir / "cache" / "thumbnails" / "bench.jpg", "wb") as f:
+        f.write(FAKE_JPEG)
+
+    return {
+        "base_dir": base_dir,
+        "backend_dir": backend_dir,
+        "recipes": recipes,
+        "lobby_ids": [lobby["lobbyId"] for lobby in lobbies],
+    }
+
+
+class Scenario:
+    def __init__(self, name: str, method: str, path: Callable[[int], str],
+                 body: Optional[Callable[[int], Dict]] = None, stream: bool = False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.stream = stream
+
+
+def build_scenarios(fixtures: Dict, rng: random.Random) -> List[Scenario]:
+    recipe_ids = [recipe["id"] for recipe in fixtures["recipes"]]
+    lobby_ids = fixtures["lobby_ids"]
+    cuisines = ['italian', 'mexican', 'chinese', 'indian', 'french']
+
+    def some_ids(i):
+        return ",".join(str(recipe_ids[(i + k) % len(recipe_ids)]) for k in range(5))
+
+    return [
+        Scenario("home", "GET", lambda i: "/"),
+        Scenario("cache-stats", "GET", lambda i: "/cache-stats"),
+        Scenario("groceries", "GET", lambda i: "/recipes/groceries"),
+        Scenario("getFridgeItems", "GET", lambda i: "/recipes/getFridgeItems"),
+        Scenario("addFridgeItem", "POST", lambda i: "/recipes/addFridgeItem",
+                 lambda i: {"name": f"bench item {i}", "quantity": "1"}),
+        Scenario("deleteFridgeItem", "POST", lambda i: "/recipes/deleteFridgeItem",
+                 lambda i: {"ingredient": f"bench item {i}"}),
+        Scenario("fridgeImages", "GET", lambda i: "/recipes/fridgeImages/bench.jpg"),
+        Scenario("getRecipesFromIngredients", "GET", lambda i: "/recipes/getRecipesFromIngredients"),
+        Scenario("getRecipesFromIngredientsForRecommendations", "GET",
+                 lambda i: "/recipes/getRecipesFromIngredientsForRecommendations"),
+        Scenario("getRecipeInformation", "GET",
+                 lambda i: f"/recipes/getRecipeInformation/{recipe_ids[i % len(recipe_ids)]}"),
+        Scenario("getBulkRecipeInformation", "GET", lambda i: f"/recipes/getBulkRecipeInformation?ids={some_ids(i)}"),
+        Scenario("searchRecipe", "GET", lambda i: f"/recipes/searchRecipe?recipe={rng.choice(FOODS)}"),
+        Scenario("searchByCuisine", "GET", lambda i: f"/recipes/searchByCuisine?cuisine={cuisines[i % len(cuisines)]}"),
+        Scenario("topRecipesFromIngredients", "GET",
+                 lambda i: f"/recipes/topRecipesFromIngredients?cuisine={cuisines[i % len(cuisines)]}"),
+        Scenario("create-lobby", "POST", lambda i: "/create-lobby",
+                 lambda i: {"lobbyId": f"bench-new-{i}", "title": "Bench", "date": "2025-02-13T05:00:00.000Z"}),
+        Scenario("lobby", "GET", lambda i: f"/lobby/{lobby_ids[i % len(lobby_ids)]}"),
+        Scenario("submit-dietary-info", "POST", lambda i: f"/submit-dietary-info/{lobby_ids[i % len(lobby_ids)]}",
+                 lambda i: synthetic_participant(rng, 1_000_000 + i)),
+        Scenario("get-participants", "GET", lambda i: f"/get-participants/{lobby_ids[i % len(lobby_ids)]}"),
+        Scenario("lobby-recommendations", "GET", lambda i: f"/lobby/{lobby_ids[i % len(lobby_ids)]}/recommendations"),
+        Scenario("lobby-events", "GET", lambda i: f"/lobby/{lobby_ids[i % len(lobby_ids)]}/events", stream=True),
+    ]
+
+
+def timed_request(session: requests.Session, base_url: str, scenario: Scenario, i: int):
+    """(latency in seconds, status code or None on a connection error); streams are timed to their first frame"""
+    start = time.perf_counter()
+    try:
+        body = scenario.body(i) if scenario.body else None
+        with session.request(scenario.method, base_url + scenario.path(i), json=body,
+                             stream=scenario.stream, timeout=30) as response:
+            if scenario.stream:
+                next(response.iter_content(chunk_size=None), None)
+            else:
+                response.content
+            status = response.status_code
+    except requests.RequestException:
+        status = None
+    return time.perf_counter() - start, status
+
+
+UPSTREAM_SAMPLE = re.compile(r'^app_upstream_requests_total\{.*route="([^"]*)".*\} (\S+)$')
+
+
+def request_upstream_calls(session: requests.Session, base_url: str) -> float:
+    """Outbound calls made by requests so far, from /metrics; prefetching and other background work is left out"""
+    total = 0.0
+    for line in session.get(base_url + "/metrics", timeout=30).text.splitlines():
+        sample = UPSTREAM_SAMPLE.match(line)
+        if sample and sample.group(1) != "background":
+            total += float(sample.group(2))
+    return total
+
+
+def run_phase(base_url: str, scenarios: List[Scenario], count: int, concurrency: int, first: int = 0) -> Dict:
+    """Send count requests cycling through scenarios; request i of a scenario uses index first + i"""
+    local = threading.local()
+
+    def one(i):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return timed_request(local.session, base_url, scenarios[i % len(scenarios)], first + i // len(scenarios))
+
+    metrics_session = requests.Session()
+    calls_before = request_upstream_calls(metrics_session, base_url)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(count)))
+    elapsed = time.perf_counter() - start
+    calls = request_upstream_calls(metrics_session, base_url) - calls_before
+
+    latencies = np.array([latency for latency, _ in outcomes]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if count else (0, 0, 0)
+    return {
+        "requests": count,
+        # 4xx answers are reported apart from failures: in the mixed phase a deleteFridgeItem can
+        # reach the server before the addFridgeItem it undoes and get a 404
+        "errors": sum(1 for _, status in outcomes if status is None or status >= 500),
+        "client_errors": sum(1 for _, status in outcomes if status is not None and 400 <= status < 500),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "rps": round(count / elapsed, 1) if elapsed else 0.0,
+        # Only calls the phase's own requests made: background work left over from earlier phases
+        # (prefetching, image lookups) is labelled "background" and would otherwise be charged here
+        "upstream_per_request": round(calls / count, 3) if count else 0.0,
+    }
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def start_app(fixtures: Dict, upstream: FakeUpstream):
+    os.environ.update({
+        "BASE_DIR": str(fixtures["base_dir"]),
+        "BACKEND_DIR": str(fixtures["backend_dir"]),
+        "SPOONACULAR_URL": upstream.url,
+        "PIXABAY_URL": upstream.url + "/api/",
+        "SPOONACULAR_DAILY_POINTS": f"{upstream.daily_points:g}",
+    })
+    sys.path.insert(0, str(project_root / "core"))
+    flask_app = importlib.import_module("app").app
+    server = make_server("127.0.0.1", 0, flask_app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def print_report(results: Dict[str, Dict]):
+    header = f"{'route':<46}{'reqs':>6}{'errs':>6}{'4xx':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'up/req':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<46}{r['requests']:>6}{r['errors']:>6}{r['client_errors']:>6}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+              f"{r['p99_ms']:>9.1f}{r['rps']:>9.1f}{r['upstream_per_request']:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backend routes against a local fake Spoonacular/Pixabay")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Injected upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Random +/- added to the upstream latency")
+    parser.add_argument("--recipes", type=int, default=0, help="Synthetic recipes added to recipes.json")
+    parser.add_argument("--lobbies", type=int, default=0, help="Synthetic lobbies added to rooms.json")
+    parser.add_argument("--participants", type=int, default=3, help="Participants per synthetic lobby")
+    parser.add_argument("--fridge-rows", type=int, default=0, help="Synthetic fridge rows")
+    parser.add_argument("--catalog-items", type=int, default=0, help="Synthetic flyer items spread over the stores")
+    parser.add_argument("--route", action="append", dest="routes", help="Only run routes containing this (repeatable)")
+    parser.add_argument("--no-mixed", action="store_true", help="Skip the phase mixing every route")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep the fixture folder for inspection")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    root = Path(tempfile.mkdtemp(prefix="conuhacks-bench-"))
+    try:
+        start = time.perf_counter()
+        fixtures = write_fixtures(root, args, rng)
+        upstream = FakeUpstream(fixtures["recipes"], args.latency_ms / 1000, args.jitter_ms / 1000).start()
+        server, base_url = start_app(fixtures, upstream)
+        print(f"Fixtures and startup: {time.perf_counter() - start:.2f}s (fixtures in {root})")
+
+        scenarios = build_scenarios(fixtures, rng)
+        if args.routes:
+            scenarios = [s for s in scenarios if any(route in s.name for route in args.routes)]
+
+        results = {}
+        for scenario in scenarios:
+            results[scenario.name] = run_phase(base_url, [scenario], args.requests, args.concurrency)
+            print(f"  {scenario.name}: {results[scenario.name]['p50_ms']} ms p50")
+        if not args.no_mixed and len(scenarios) > 1:
+            # Indexes continue after the per-route phases so created lobbies and fridge items stay unique
+            results["mixed"] = run_phase(base_url, scenarios, args.requests * len(scenarios),
+                                         args.concurrency, first=args.requests)
+
+        print()
+        print_report(results)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"settings": vars(args), "results": results, "upstream_calls": upstream.calls}, f, indent=2)
+
+        server.shutdown()
+        upstream.stop()
+    finally:
+        if args.keep:
+            print(f"Fixtures kept in {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
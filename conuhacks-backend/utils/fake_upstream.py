@@ -0,0 +1,147 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+# Not a real picture, the backend only stores the bytes
+FAKE_JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 1024 + b"\xff\xd9"
+
+
+def recipe_details(recipe: Dict) -> Dict:
+    """informationBulk-shaped details built from a findByIngredients-shaped recipe"""
+    ingredients = recipe.get("usedIngredients", []) + recipe.get("missedIngredients", [])
+    return {
+        "id": recipe["id"],
+        "title": recipe.get("title"),
+        "image": recipe.get("image"),
+        "imageType": recipe.get("imageType"),
+        "servings": 2,
+        "readyInMinutes": 30,
+        "extendedIngredients": [
+            {key: ingredient.get(key) for key in ("id", "name", "original", "amount", "unit", "image", "aisle")}
+            for ingredient in ingredients
+        ],
+        "instructions": "Mix everything together.",
+    }
+
+
+class FakeUpstream:
+    """Local stand-in for the Spoonacular and Pixabay APIs.
+
+    Replays recorded findByIngredients recipes (recipes.json) for every
+    Spoonacular endpoint the backend calls and answers Pixabay searches with a
+    placeholder image. Every answer waits latency +/- jitter seconds first, and
+    calls are counted per path so a benchmark can report upstream calls per
+    request. Spoonacular answers carry X-API-Quota-* headers (1 point per call
+    plus 0.01 per result) and turn into 402s once daily_points are spent.
+    """
+
+    def __init__(self, recipes: List[Dict], latency: float = 0.05, jitter: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0, daily_points: float = 1_000_000):
+        self.recipes = recipes
+        self.by_id = {recipe["id"]: recipe for recipe in recipes}
+        self.latency = latency
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.daily_points = daily_points
+        self.points_used = 0.0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeUpstream":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, path: str):
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+
+    def _charge(self, body: str) -> Dict[str, str]:
+        """Quota headers for one Spoonacular answer, or None when the quota is spent"""
+        value = json.loads(body)
+        results = value.get("results", []) if isinstance(value, dict) else value
+        points = 1 + 0.01 * len(results)
+        with self._lock:
+            if self.points_used + points > self.daily_points:
+                return None
+            self.points_used += points
+            return {
+                "X-API-Quota-Request": f"{points:g}",
+                "X-API-Quota-Used": f"{self.points_used:g}",
+                "X-API-Quota-Left": f"{self.daily_points - self.points_used:g}",
+            }
+
+    def _delay(self):
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def answer(self, path: str, query: Dict[str, List[str]]):
+        """(status, content type, body) for one upstream request"""
+        number = int(query.get("number", ["10"])[0])
+        if path.endswith("/recipes/findByIngredients"):
+            return 200, "application/json", json.dumps(self.recipes[:number])
+        if path.endswith("/recipes/informationBulk"):
+            ids = [int(i) for i in query.get("ids", [""])[0].split(",") if i.strip().isdigit()]
+            details = [recipe_details(self.by_id[i]) for i in ids if i in self.by_id]
+            return 200, "application/json", json.dumps(details)
+        if path.endswith("/recipes/complexSearch"):
+            offset = int(query.get("offset", ["0"])[0])
+            results = self.recipes[offset:offset + number]
+            return 200, "application/json", json.dumps(
+                {"results": results, "offset": offset, "number": number, "totalResults": len(self.recipes)}
+            )
+        if path.startswith("/api"):
+            slug = re.sub(r"[^a-z0-9]+", "-", query.get("q", ["item"])[0].lower()).strip("-") or "item"
+            hit = {"webformatURL": f"{self.url}/images/{slug}.jpg", "previewURL": f"{self.url}/images/{slug}.jpg"}
+            return 200, "application/json", json.dumps({"total": 1, "totalHits": 1, "hits": [hit]})
+        if path.startswith("/images/"):
+            return 200, "image/jpeg", FAKE_JPEG
+        return 404, "application/json", json.dumps({"status": "failure", "message": f"Unknown path {path}"})
+
+    def _handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                upstream._count(parsed.path)
+                upstream._delay()
+                status, content_type, body = upstream.answer(parsed.path, parse_qs(parsed.query))
+                headers = {}
+                if parsed.path.startswith("/recipes/") and status == 200:
+                    headers = upstream._charge(body)
+                    if headers is None:
+                        status, headers = 402, {}
+                        body = json.dumps({"status": "failure", "code": 402, "message": "Daily points limit reached"})
+                body = body.encode("utf-8") if isinstance(body, str) else body
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,79 @@
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+# Claude downsizes anything with a long edge above ~1568px, so larger uploads are wasted bytes
+TARGET_LONG_EDGE = 1568
+JPEG_QUALITY = 82
+# Pages taller than this ratio are cut into overlapping tiles so the text stays legible
+MAX_ASPECT = 2.0
+TILE_OVERLAP = 0.05
+# Rows/columns whose pixels are all at least this bright count as blank margin
+BLANK_THRESHOLD = 245
+
+
+def crop_margins(image: np.ndarray, threshold: int = BLANK_THRESHOLD, padding: int = 8) -> np.ndarray:
+    """Drop uniform white borders around the page"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    content = gray < threshold
+    rows = np.flatnonzero(content.any(axis=1))
+    cols = np.flatnonzero(content.any(axis=0))
+    if rows.size == 0 or cols.size == 0:
+        return image
+    top, bottom = max(rows[0] - padding, 0), min(rows[-1] + padding + 1, image.shape[0])
+    left, right = max(cols[0] - padding, 0), min(cols[-1] + padding + 1, image.shape[1])
+    return image[top:bottom, left:right]
+
+
+def split_tiles(image: np.ndarray, max_aspect: float = MAX_ASPECT, overlap: float = TILE_OVERLAP) -> List[np.ndarray]:
+    height, width = image.shape[:2]
+    if height <= width * max_aspect:
+        return [image]
+    tile_height = int(width * max_aspect)
+    step = max(1, int(tile_height * (1 - overlap)))
+    tiles = []
+    for top in range(0, height, step):
+        tiles.append(image[top:top + tile_height])
+        if top + tile_height >= height:
+            break
+    return tiles
+
+
+def downscale(image: np.ndarray, long_edge: int = TARGET_LONG_EDGE) -> np.ndarray:
+    height, width = image.shape[:2]
+    scale = long_edge / max(height, width)
+    if scale >= 1:
+        return image
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def preprocess_image(image_bytes: bytes, long_edge: int = TARGET_LONG_EDGE,
+                     quality: int = JPEG_QUALITY) -> Tuple[List[bytes], Dict]:
+    """Crop, tile, downscale and re-encode one flyer page.
+
+    Returns the JPEG bytes of each tile and the before/after byte counts. If the
+    result would be larger than the original (already small pages), the original
+    bytes are sent unchanged.
+    """
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return [image_bytes], {"original_bytes": len(image_bytes), "encoded_bytes": len(image_bytes), "tiles": 1}
+
+    encoded = []
+    for tile in split_tiles(crop_margins(image)):
+        ok, buffer = cv2.imencode(".jpg", downscale(tile, long_edge),
+                                  [cv2.IMWRITE_JPEG_QUALITY, quality, cv2.IMWRITE_JPEG_OPTIMIZE, 1])
+        if not ok:
+            raise ValueError("Could not re-encode flyer page")
+        encoded.append(buffer.tobytes())
+
+    if sum(len(tile) for tile in encoded) >= len(image_bytes):
+        encoded = [image_bytes]
+
+    return encoded, {
+        "original_bytes": len(image_bytes),
+        "encoded_bytes": sum(len(tile) for tile in encoded),
+        "tiles": len(encoded),
+    }
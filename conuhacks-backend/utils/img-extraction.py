@@ -1,28 +1,50 @@
 import os
 import base64
+import hashlib
 import json
-from typing import List, Dict
+import argparse
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 from dotenv import load_dotenv
 import anthropic
+from image_preprocess import preprocess_image, TARGET_LONG_EDGE, JPEG_QUALITY
+from page_hash import dhash, format_hash, parse_hash, PageHashIndex, MAX_DISTANCE
 
 project_root = Path(__file__).parent.parent
 load_dotenv(project_root / '.env')
 
+DEFAULT_JOURNAL = project_root / 'extraction_journal.jsonl'
+
+
 class ClaudeAPI:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, preprocess: bool = True, long_edge: int = TARGET_LONG_EDGE,
+                 quality: int = JPEG_QUALITY):
         self.client = anthropic.Anthropic(api_key=api_key)
         self.model = "claude-3-5-sonnet-20241022"  # Updated to latest model
+        self.preprocess = preprocess
+        self.long_edge = long_edge
+        self.quality = quality
 
-    def encode_image(self, image_path: str) -> str:
+    def prepare_image(self, image_path: str):
+        """Shrink the page before upload; returns base64 tiles and byte counts"""
         with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+            image_bytes = image_file.read()
+        if not self.preprocess:
+            tiles, stats = [image_bytes], {"original_bytes": len(image_bytes), "encoded_bytes": len(image_bytes), "tiles": 1}
+        else:
+            tiles, stats = preprocess_image(image_bytes, self.long_edge, self.quality)
+        return [base64.b64encode(tile).decode('utf-8') for tile in tiles], stats
 
     def get_grocery_info(self, image_path: str) -> Dict:
         """Process a single image"""
         try:
-            encoded_image = self.encode_image(image_path)
+            encoded_tiles, stats = self.prepare_image(image_path)
             
+            start = time.perf_counter()
             message = self.client.messages.create(
                 model=self.model,
                 max_tokens=1024,
@@ -35,60 +57,233 @@ class ClaudeAPI:
                                 "type": "text",
                                 "text": "Please analyze this grocery flyer and return a JSON array of items. For each item include: name, price, unit (if applicable), and any special deals. Format as valid JSON."
                             },
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": encoded_image
+                            *[
+                                {
+                                    "type": "image",
+                                    "source": {
+                                        "type": "base64",
+                                        "media_type": "image/jpeg",
+                                        "data": encoded_image
+                                    }
                                 }
-                            }
+                                for encoded_image in encoded_tiles
+                            ]
                         ]
                     }
                 ]
             )
+            stats["latency_s"] = round(time.perf_counter() - start, 3)
             
             # Extract the content from the response
             return {
                 "image": image_path,
-                "content": message.content
+                "content": [block.model_dump() for block in message.content],
+                "stats": stats
             }
 
         except Exception as e:
             print(f"Error processing {image_path}: {str(e)}")
             return {"error": str(e), "image": image_path}
 
-def process_flyer_images(api_key: str, image_paths: List[str], output_file: str):
-    claude = ClaudeAPI(api_key)
-    results = []
-    
+
+class RateLimiter:
+    """Spaces out calls so no more than `per_minute` start in any minute"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        time.sleep(max(0.0, start - now))
+
+
+class ExtractionJournal:
+    """Append-only JSONL log of extraction results, keyed by SHA-256 of the image bytes.
+
+    Every finished page is appended as one line, so a crashed run loses nothing
+    and the next run skips every page whose bytes were already extracted.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.results: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Partial line from a crash mid-write
+                    if "error" not in entry:
+                        self.results[entry["sha256"]] = entry
+
+    def get(self, digest: str) -> Optional[Dict]:
+        return self.results.get(digest)
+
+    def append(self, entry: Dict):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            if "error" not in entry:
+                self.results[entry["sha256"]] = entry
+
+
+def flyer_period(image_path: str) -> str:
+    """Thursday the flyer week of a downloaded page began (Quebec flyers run Thursday to Wednesday)"""
+    day = datetime.date.fromtimestamp(os.path.getmtime(image_path))
+    return (day - datetime.timedelta(days=(day.weekday() - 3) % 7)).isoformat()
+
+
+def page_scope(image_path: str, period: Optional[str] = None) -> Tuple[str, str]:
+    """Pages may only share an extraction within one store folder and flyer period"""
+    return str(Path(image_path).resolve().parent), period or flyer_period(image_path)
+
+
+def process_flyer_images(api_key: str, image_paths: List[str], output_file: str,
+                         concurrency: int = 4, requests_per_minute: float = 40,
+                         journal_path: str = DEFAULT_JOURNAL, preprocess: bool = True,
+                         long_edge: int = TARGET_LONG_EDGE, quality: int = JPEG_QUALITY,
+                         max_distance: int = MAX_DISTANCE, period: Optional[str] = None):
+    claude = ClaudeAPI(api_key, preprocess, long_edge, quality)
+    journal = ExtractionJournal(str(journal_path))
+    limiter = RateLimiter(requests_per_minute)
+    results: Dict[str, Dict] = {}
+    report = {"pages": len(image_paths), "exact_reused": 0, "near_duplicate_reused": 0,
+              "duplicates_in_run": 0, "extracted": 0}
+
+    # Pages already extracted, findable by how they look rather than their exact bytes. Only
+    # pages that were really extracted count, so one reuse never becomes the source of the next.
+    seen_pages: Dict[Tuple[str, str], PageHashIndex] = {}
+    for digest, entry in journal.results.items():
+        page_hash = parse_hash(entry.get("dhash"))
+        if page_hash is not None and entry.get("scope") and "reused_from" not in entry:
+            seen_pages.setdefault(tuple(entry["scope"]), PageHashIndex()).add(page_hash, digest)
+    run_pages: Dict[Tuple[str, str], PageHashIndex] = {}
+
+    pending, followers, hashes, scopes = {}, {}, {}, {}
     for image_path in image_paths:
+        with open(image_path, "rb") as f:
+            image_bytes = f.read()
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        page_hash = dhash(image_bytes)
+        hashes[image_path] = (digest, format_hash(page_hash) if page_hash is not None else None)
+        scope = scopes[image_path] = page_scope(image_path, period)
+
+        cached = journal.get(digest)
+        if cached:
+            print(f"Unchanged, reusing extraction for {image_path}")
+            results[image_path] = {**cached, "image": image_path}
+            report["exact_reused"] += 1
+            continue
+
+        near = None
+        if page_hash is not None and scope in seen_pages:
+            near = seen_pages[scope].nearest(page_hash, max_distance)
+        if near:
+            source, distance = near
+            print(f"Near-duplicate of a previous page (distance {distance}), reusing extraction for {image_path}")
+            entry = {**journal.get(source), "image": image_path, "sha256": digest,
+                     "dhash": hashes[image_path][1], "scope": list(scope), "reused_from": source}
+            journal.append(entry)
+            results[image_path] = entry
+            report["near_duplicate_reused"] += 1
+            continue
+
+        leader = None
+        if page_hash is not None and scope in run_pages:
+            leader = run_pages[scope].nearest(page_hash, max_distance)
+        if leader:
+            followers[image_path] = leader[0]
+            report["duplicates_in_run"] += 1
+            continue
+
+        pending[image_path] = digest
+        if page_hash is not None:
+            run_pages.setdefault(scope, PageHashIndex()).add(page_hash, image_path)
+
+    def extract(image_path: str) -> Dict:
+        limiter.wait()
         print(f"\nProcessing {image_path}...")
         result = claude.get_grocery_info(image_path)
-        results.append(result)
-        
-        # Save results after each image in case of failures
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump({"results": results}, f, indent=2, ensure_ascii=False)
-        print(f"Progress saved to {output_file}")
+        entry = {**result, "sha256": pending[image_path], "dhash": hashes[image_path][1],
+                 "scope": list(scopes[image_path])}
+        journal.append(entry)
+        return entry
 
-    print(f"\nAll processing complete. Results saved to {output_file}")
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(extract, image_path): image_path for image_path in pending}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            print(f"Progress saved to {journal.path} ({len(results)}/{len(image_paths)})")
+    report["extracted"] = len(pending)
+
+    # Pages that looked like another page of this run share its extraction
+    for image_path, leader in followers.items():
+        digest, page_hash = hashes[image_path]
+        entry = {**results[leader], "image": image_path, "sha256": digest, "dhash": page_hash,
+                 "scope": list(scopes[image_path]), "reused_from": pending[leader]}
+        entry.pop("stats", None)
+        if "error" not in entry:
+            journal.append(entry)
+        results[image_path] = entry
+
+    # The combined file is written once, in input order, after every page is done
+    ordered = [results[image_path] for image_path in image_paths]
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump({"results": ordered, "report": report}, f, indent=2, ensure_ascii=False)
+
+    avoided = report["pages"] - report["extracted"]
+    print(f"\nAll processing complete. {report['extracted']} extracted, {avoided} extraction calls avoided "
+          f"({report['exact_reused']} unchanged, {report['near_duplicate_reused']} near-duplicates of earlier pages, "
+          f"{report['duplicates_in_run']} duplicates within this run). Results saved to {output_file}")
+    print_transfer_summary([results[image_path] for image_path in pending])
+    return report
+
+
+def print_transfer_summary(entries: List[Dict]):
+    stats = [entry["stats"] for entry in entries if "stats" in entry]
+    if not stats:
+        return
+    original = sum(s["original_bytes"] for s in stats)
+    encoded = sum(s["encoded_bytes"] for s in stats)
+    latencies = [s["latency_s"] for s in stats if "latency_s" in s]
+    print(f"Uploaded {encoded / 1024:.0f} KB instead of {original / 1024:.0f} KB "
+          f"({100 * (1 - encoded / original):.0f}% saved) across {len(stats)} pages")
+    if latencies:
+        print(f"Extraction latency: {sum(latencies) / len(latencies):.2f}s mean, {max(latencies):.2f}s max")
 
 def main():
+    parser = argparse.ArgumentParser(description="Extract grocery deals from flyer page images")
+    parser.add_argument("images", nargs="*", default=['conuhacks-backend/flyer/supermarche-iga/iga-01.jpg'],
+                        help="Flyer page images to process")
+    parser.add_argument("--output", default="grocery_results.json", help="Combined results file")
+    parser.add_argument("--concurrency", type=int, default=4, help="Pages extracted at the same time")
+    parser.add_argument("--rpm", type=float, default=40, help="Maximum extraction requests per minute")
+    parser.add_argument("--journal", default=str(DEFAULT_JOURNAL), help="JSONL journal / extraction cache")
+    parser.add_argument("--long-edge", type=int, default=TARGET_LONG_EDGE, help="Downscale pages to this many pixels")
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY, help="JPEG quality used when re-encoding")
+    parser.add_argument("--no-preprocess", action="store_true", help="Upload the original page bytes")
+    parser.add_argument("--max-distance", type=int, default=MAX_DISTANCE,
+                        help="Largest dHash distance (of 256 bits) treated as the same page")
+    parser.add_argument("--period", help="Flyer period the pages belong to (default: their download week)")
+    args = parser.parse_args()
+
     # Load environment variables from .env file
     api_key = os.getenv("ANTHROPIC_API_KEY")
     if not api_key:
         raise ValueError("ANTHROPIC_API_KEY not found in .env file")
-    
+
     if not api_key.startswith("sk-"):
         raise ValueError("Invalid API key format. Should start with 'sk-'")
 
-    # Example image paths
-    image_paths = [
-        'conuhacks-backend/flyer/supermarche-iga/iga-01.jpg'
-    ]
-
-    process_flyer_images(api_key, image_paths, "grocery_results.json")
+    process_flyer_images(api_key, args.images, args.output, args.concurrency, args.rpm, args.journal,
+                         not args.no_preprocess, args.long_edge, args.quality, args.max_distance, args.period)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict
+
+project_root = Path(__file__).parent.parent
+# Prices are parsed and ingredients named exactly like the backend does it
+sys.path.insert(0, str(project_root / "core"))
+
+from ingredients import canonical_ingredients
+from price_index import parse_price
+
+# Raw extraction output -> normalized catalog written next to it; the backend only reads IGA's
+DEFAULT_OUTPUTS = {
+    "iga_results.json": "simplified_results.json",
+}
+
+# Categories whose items can end up in a recipe
+COMESTIBLE_CATEGORIES = [
+    'frozen_and_prepared',
+    'pantry',
+    'meat_and_seafood',
+    'dairy_and_cheese',
+    'produce',
+    'snacks',
+    'snacks_and_treats',
+]
+
+# Capitalized words that describe the food rather than the brand, so they are never stripped
+GENERIC_WORDS = {
+    'alfredo', 'almonds', 'apple', 'apples', 'bacon', 'bagels', 'bars', 'beans', 'beef', 'beer', 'black',
+    'blackberries', 'blueberries', 'boneless', 'bread', 'breaded', 'brie', 'broccoli', 'butter', 'cake',
+    'carrots', 'cereal', 'cheddar', 'cheese', 'chewy', 'chicken', 'chips', 'chocolate', 'coffee', 'cookies',
+    'crackers', 'cream', 'cucumbers', 'dark', 'diced', 'dips', 'drumsticks', 'eggs', 'figs', 'fish', 'fresh',
+    'fries', 'frozen', 'grape', 'greek', 'ground', 'ham', 'hot', 'hummus', 'ice', 'iced', 'juice', 'kiwi',
+    'lean', 'lettuce', 'milk', 'mini', 'mushrooms', 'natural', 'olive', 'orange', 'oranges', 'organic',
+    'pasta', 'pizza', 'popcorn', 'popping', 'pork', 'potatoes', 'raspberries', 'red', 'rice', 'salmon',
+    'sauce', 'sausages', 'seedless', 'shrimp', 'skinless', 'snacks', 'soup', 'sparkling', 'strawberries',
+    'sweet', 'swiss', 'tea', 'thighs', 'tomato', 'tomatoes', 'turkey', 'vegetables', 'veggie', 'water',
+    'white', 'whole', 'yogurt',
+}
+
+# Product lines whose name is only a brand; map them to what they are
+BRAND_PRODUCTS = {
+    'corona extra': 'beer',
+    'gatorade zero': 'sports drink',
+    'ferrero rocher': 'chocolate',
+    'kraft dinner': 'macaroni and cheese',
+    'pringles': 'chips',
+    'pringles party size': 'chips',
+    'quaker dipps': 'granola bars',
+    'red bull energy drink': 'energy drink',
+}
+
+
+def strip_brand(alternative: str) -> str:
+    words = alternative.split()
+    # Leading capitalized (or symbol-only) words that aren't food words are the brand
+    while len(words) > 1 and (
+        not re.search(r'[a-zA-Z]', words[0])
+        or (words[0][:1].isupper() and words[0].lower().strip("'.") not in GENERIC_WORDS)
+    ):
+        words.pop(0)
+    return ' '.join(words)
+
+
+def canonical_name(raw_name: str) -> str:
+    """Strip brand words and sizes from a flyer item name"""
+    name = re.sub(r'\(.*?\)', '', raw_name).strip()
+
+    lowered = ' '.join(name.lower().split())
+    if lowered in BRAND_PRODUCTS:
+        name = BRAND_PRODUCTS[lowered]
+    else:
+        # "A, B or C thing" lists alternatives; a bare brand alternative says nothing about the food
+        alternatives = [strip_brand(part) for part in re.split(r',|\bor\b', name) if part.strip()]
+        kept = [
+            part for part in alternatives
+            if ' ' in part or part.islower() or part.lower() in GENERIC_WORDS
+        ]
+        name = ' or '.join(kept or alternatives[-1:])
+
+    return ' '.join(name.lower().split())
+
+
+def unit_price(raw_price) -> float:
+    price = parse_price(raw_price)
+    return price if price is not None else float('inf')
+
+
+def normalize_results(data: Dict) -> Dict:
+    categories: Dict[str, Dict[str, str]] = {}
+    comestible_names = []
+    for category, raw_items in data.get("categories", {}).items():
+        categories[category] = {}
+        for raw_name, raw_price in raw_items.items():
+            name = canonical_name(raw_name)
+            current = categories[category].get(name)
+            # Several brands can collapse into one name; the cheapest offer is the one worth showing
+            if current is None or unit_price(raw_price) < unit_price(current):
+                categories[category][name] = raw_price
+            if category in COMESTIBLE_CATEGORIES:
+                comestible_names.append(name)
+
+    return {
+        "store": data.get("store"),
+        "valid_dates": data.get("valid_dates"),
+        "categories": categories,
+        "ingredients": canonical_ingredients(comestible_names),
+        "notes": data.get("notes"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize raw flyer extraction results into canonical ingredients")
+    parser.add_argument("inputs", nargs="*", default=list(DEFAULT_OUTPUTS), help="Raw store results files")
+    parser.add_argument("--data-dir", default=str(project_root), help="Folder the results files live in")
+    args = parser.parse_args()
+
+    for input_name in args.inputs:
+        source = Path(args.data_dir) / input_name
+        target = Path(args.data_dir) / DEFAULT_OUTPUTS.get(input_name, source.stem + "_simplified.json")
+        with open(source, 'r', encoding='utf-8') as f:
+            normalized = normalize_results(json.load(f))
+        with open(target.with_suffix(".tmp"), 'w', encoding='utf-8') as f:
+            json.dump(normalized, f, indent=2, ensure_ascii=False)
+        # Atomic swap so the backend's catalog never reads a half-written file
+        target.with_suffix(".tmp").replace(target)
+        items = sum(len(items) for items in normalized['categories'].values())
+        print(f"{source.name} -> {target.name}: {items} items, {len(normalized['ingredients'])} ingredients")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from typing import Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+HASH_SIZE = 16
+HASH_BITS = HASH_SIZE * HASH_SIZE
+# Out of 256 bits. Re-encoding or resizing a page flips up to about 4, different pages differ
+# by about 100. No hash this coarse sees a changed price, so reuse is also kept to one
+# store's flyer week, when prices don't change.
+MAX_DISTANCE = 4
+
+
+def dhash(image_bytes: bytes) -> Optional[int]:
+    """256-bit difference hash: compares neighbouring pixels of a 17x16 grayscale thumbnail"""
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return None
+    small = cv2.resize(image, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def format_hash(page_hash: int) -> str:
+    return f"{page_hash:0{HASH_BITS // 4}x}"
+
+
+def parse_hash(text: Optional[str]) -> Optional[int]:
+    """The hash stored by format_hash, or None for one of another size (older journals)"""
+    if not text or len(text) != HASH_BITS // 4:
+        return None
+    return int(text, 16)
+
+
+def _hash_row(page_hash: int) -> np.ndarray:
+    return np.frombuffer(page_hash.to_bytes(HASH_BITS // 8, "big"), dtype=np.uint8)
+
+
+class PageHashIndex:
+    """Finds the closest previously extracted page by Hamming distance between dHashes"""
+
+    def __init__(self, entries: Iterable[Tuple[int, str]] = ()):
+        self._hashes = np.zeros((0, HASH_BITS // 8), dtype=np.uint8)
+        self._keys = []
+        for page_hash, key in entries:
+            self.add(page_hash, key)
+
+    def add(self, page_hash: int, key: str):
+        self._hashes = np.vstack([self._hashes, _hash_row(page_hash)])
+        self._keys.append(key)
+
+    def nearest(self, page_hash: int, max_distance: int = MAX_DISTANCE) -> Optional[Tuple[str, int]]:
+        if not self._keys:
+            return None
+        xor = np.bitwise_xor(self._hashes, _hash_row(page_hash))
+        distances = np.unpackbits(xor, axis=1).sum(axis=1)
+        best = int(np.argmin(distances))
+        if distances[best] > max_distance:
+            return None
+        return self._keys[best], int(distances[best])
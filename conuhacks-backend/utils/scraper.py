@@ -1,7 +1,11 @@
+import argparse
+import json
 import os
-import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
@@ -9,11 +13,21 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 
-def scrape_flyer_images(store: str, region: str):
-    
+CHUNK_SIZE = 256 * 1024
+DEFAULT_WORKERS = 6
+# Per-folder record of ETag / Last-Modified / size for every downloaded page
+META_FILE = ".downloads.json"
+
+# Alt text of the "flyer in pictures" link on each store's circulaires.com page
+FLYER_LINK_ALTS = {
+    "supermarche-iga": "Circulaire IGA en images",
+}
+
+
+def new_driver():
     # Configure Chrome options for headless browsing
     chrome_options = Options()
     chrome_options.add_argument("--headless")  # Run in headless mode
@@ -22,73 +36,190 @@ def scrape_flyer_images(store: str, region: str):
     service = Service(ChromeDriverManager().install())
     driver = webdriver.Chrome(service=service, options=chrome_options)
     driver.maximize_window()
+    return driver
+
+
+def new_session(workers):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def clean_image_url(url):
+    return url.split('?')[0]
+
+
+def find_flyer_image_urls(driver, store: str, region: str):
+    """Walk circulaires.com to the flyer page and return the page image URLs"""
+    url = f"https://www.circulaires.com/{store}/?region={region}"
+    driver.get(url)
+
+    alt = FLYER_LINK_ALTS.get(store)
+    link_xpath = f"//img[@alt='{alt}']/.." if alt else "//img[contains(@alt, 'en images')]/.."
+    try:
+        WebDriverWait(driver, 3).until(EC.element_to_be_clickable((By.XPATH, link_xpath)))
+        link = driver.find_element(By.XPATH, link_xpath)
+        driver.execute_script("arguments[0].setAttribute('target', '_self');", link)
+        link.click()
+    except (NoSuchElementException, TimeoutException):
+        print("Flyer link not found!")
+        return []
+
+    try:
+        WebDriverWait(driver, 3).until(
+            EC.presence_of_element_located((By.XPATH, f"//a[@href='../page.do?region={region}']"))
+        )
+        td_element = driver.find_element(By.XPATH, f"//td[@width='65'][@valign='top'][@nowrap]//a[@href='../page.do?region={region}']")
+        ActionChains(driver).move_to_element(td_element).click().perform()
+    except (NoSuchElementException, TimeoutException):
+        print("Could not find the flyer page link.")
+        return []
 
     try:
-        url = f"https://www.circulaires.com/{store}/?region={region}"
-        driver.get(url)
+        WebDriverWait(driver, 3).until(EC.presence_of_element_located((By.TAG_NAME, "table")))
+        tables = driver.find_elements(By.TAG_NAME, 'table')
+        second_table = tables[1]  # Flyer images usually appear in the second table
+        images = second_table.find_elements(By.TAG_NAME, 'img')
+    except (NoSuchElementException, TimeoutException, IndexError):
+        print("No flyer images found.")
+        return []
+
+    urls = []
+    for img in images:
+        img_url = img.get_attribute('src')
+        if img_url and f'/flyer/{store}/' not in img_url:
+            urls.append(clean_image_url(img_url))
+    return list(dict.fromkeys(urls))
+
+
+class FlyerDownloader:
+    """Downloads flyer pages in parallel, skipping pages that haven't changed.
 
+    A page is re-fetched with If-None-Match / If-Modified-Since when the server
+    gave us validators last time; a 304 leaves the file alone. Servers without
+    validators are asked for the size with a HEAD and the page is skipped when
+    it matches the file on disk.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS):
+        self.workers = workers
+        self.session = new_session(workers)
+        self._lock = threading.Lock()
+
+    def _load_meta(self, folder):
         try:
-            element = WebDriverWait(driver, 3).until(
-                EC.element_to_be_clickable((By.XPATH, "//img[@alt='Circulaire IGA en images']/.."))
-            )
-            link = driver.find_element(By.XPATH, "//img[@alt='Circulaire IGA en images']/..")
-            driver.execute_script("arguments[0].setAttribute('target', '_self');", link)
-            link.click()
-        except NoSuchElementException:
-            print("Flyer link not found!")
-            return
+            with open(os.path.join(folder, META_FILE), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
 
+    def _save_meta(self, folder, meta):
+        path = os.path.join(folder, META_FILE)
+        with open(path + ".tmp", 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def _unchanged_size(self, url, image_path):
+        if not os.path.exists(image_path):
+            return False
         try:
-            WebDriverWait(driver, 3).until(
-                EC.presence_of_element_located((By.XPATH, f"//a[@href='../page.do?region={region}']"))
-            )
-            td_element = driver.find_element(By.XPATH, f"//td[@width='65'][@valign='top'][@nowrap]//a[@href='../page.do?region={region}']")
-            ActionChains(driver).move_to_element(td_element).click().perform()
-        except NoSuchElementException:
-            print("Could not find the flyer page link.")
-            return
+            head = self.session.head(url, timeout=10, allow_redirects=True)
+        except requests.RequestException:
+            return False
+        size = head.headers.get('Content-Length')
+        return head.ok and size is not None and int(size) == os.path.getsize(image_path)
+
+    def download_image(self, url, folder, meta):
+        image_name = url.split('/')[-1]
+        image_path = os.path.join(folder, image_name)
+        previous = meta.get(image_name, {}) if os.path.exists(image_path) else {}
+
+        headers = {}
+        if previous.get('etag'):
+            headers['If-None-Match'] = previous['etag']
+        if previous.get('last_modified'):
+            headers['If-Modified-Since'] = previous['last_modified']
+        if not headers and self._unchanged_size(url, image_path):
+            return "skipped"
 
         try:
-            WebDriverWait(driver, 3).until(EC.presence_of_element_located((By.TAG_NAME, "table")))
-            tables = driver.find_elements(By.TAG_NAME, 'table')
-            second_table = tables[1]  # Flyer images usually appear in the second table
-            images = second_table.find_elements(By.TAG_NAME, 'img')
-        except NoSuchElementException:
-            print("No flyer images found.")
-            return
-
-        save_folder = f'./flyer/{store}/'
-        os.makedirs(save_folder, exist_ok=True)
-
-        def clean_image_url(url):
-            return url.split('?')[0]
-
-        def download_image(url, folder):
-            try:
-                clean_url = clean_image_url(url)
-                response = requests.get(clean_url, stream=True)
-                if response.status_code == 200:
-                    image_name = clean_url.split('/')[-1]
-                    image_path = os.path.join(folder, image_name)
-
-                    with open(image_path, 'wb') as file:
-                        for chunk in response.iter_content(1024):
-                            file.write(chunk)
-
-                    print(f"Image downloaded: {image_name}")
-                else:
+            with self.session.get(url, headers=headers, stream=True, timeout=(5, 30)) as response:
+                if response.status_code == 304:
+                    return "unchanged"
+                if response.status_code != 200:
                     print(f"Failed to download image from {url}")
-            except Exception as e:
-                print(f"Error downloading {url}: {e}")
+                    return "failed"
+
+                with open(image_path + ".part", 'wb') as file:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        file.write(chunk)
+                os.replace(image_path + ".part", image_path)
+
+                with self._lock:
+                    meta[image_name] = {
+                        'url': url,
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                        'size': os.path.getsize(image_path),
+                    }
+            print(f"Image downloaded: {image_name}")
+            return "downloaded"
+        except Exception as e:
+            print(f"Error downloading {url}: {e}")
+            return "failed"
+
+    def download_all(self, urls, folder):
+        os.makedirs(folder, exist_ok=True)
+        meta = self._load_meta(folder)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            outcomes = list(pool.map(lambda url: self.download_image(url, folder, meta), urls))
+        self._save_meta(folder, meta)
 
-        # Download images
-        for img in images:
-            img_url = img.get_attribute('src')
-            if f'/flyer/{store}/' not in img_url:
-                download_image(img_url, save_folder)
+        counts = {outcome: outcomes.count(outcome) for outcome in set(outcomes)}
+        print(f"{folder}: {counts}")
+        return counts
 
+
+def scrape_flyer_images(store: str, regions, output_dir: str = './flyer', downloader=None):
+    """Scrape every region of one store with a single headless browser.
+
+    Each region gets its own folder (and download record) under the store's, since
+    regions share page file names but not their content.
+    """
+    if isinstance(regions, str):
+        regions = [regions]
+    downloader = downloader or FlyerDownloader()
+
+    driver = new_driver()
+    try:
+        for region in regions:
+            start = time.perf_counter()
+            urls = find_flyer_image_urls(driver, store, region)
+            print(f"{store} / {region}: found {len(urls)} pages")
+            if urls:
+                downloader.download_all(urls, os.path.join(output_dir, store, region))
+            print(f"{store} / {region}: done in {time.perf_counter() - start:.1f}s")
     finally:
         driver.quit()
         print("Scraping completed.")
 
-scrape_flyer_images(store="supermarche-iga", region="Monteregie")
+
+def main():
+    parser = argparse.ArgumentParser(description="Download grocery flyer pages from circulaires.com")
+    parser.add_argument("--store", action="append", dest="stores",
+                        help="Store slug on circulaires.com (repeatable), e.g. supermarche-iga")
+    parser.add_argument("--region", action="append", dest="regions",
+                        help="Region to scrape for every store (repeatable), e.g. Monteregie")
+    parser.add_argument("--output", default="./flyer", help="Folder the store/region folders are created in")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Parallel page downloads")
+    args = parser.parse_args()
+
+    downloader = FlyerDownloader(workers=args.workers)
+    for store in args.stores or ["supermarche-iga"]:
+        scrape_flyer_images(store, args.regions or ["Monteregie"], args.output, downloader)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import React, { useState, useEffect } from "react";
 import { useParams } from "react-router-dom"; // Import useParams
-import axios from "axios";
 import { ChefHat, Coffee, Utensils, Soup, Pizza, Fish, Star, ChevronLeft, ChevronRight } from "lucide-react";
 
 const KitchenRoles = () => {
@@ -18,30 +17,35 @@ const KitchenRoles = () => {
     "Seafood specialist and fish whisperer.",
   ];
 
-  const fetchParticipants = async () => {
-    if (!lobbyId) return; 
-    try {
-      const response = await axios.get(`http://localhost:5000/get-participants/${lobbyId}`);
-      const participants = response.data.participants;
-
-      const rolesData = participants.map((participant: any) => ({
-        title: participant.name || "Unknown Chef",
-        icon: getIconForRole(participant),
-        description: randomDescriptions[Math.floor(Math.random() * randomDescriptions.length)],
-        specialties: participant.specialties || ["Mystery Skill"],
-        allergies: participant.allergies || ["None"],
-        dietaryRestrictions: participant.dietaryRestrictions || ["None"],
-        powerLevel: Math.floor(Math.random() * 5) + 1, 
-      }));
-
-      setRoles(rolesData);
-    } catch (error) {
-      console.error("Failed to fetch participants", error);
-    }
-  };
+  const toRole = (participant: any) => ({
+    title: participant.name || "Unknown Chef",
+    icon: getIconForRole(participant),
+    description: randomDescriptions[Math.floor(Math.random() * randomDescriptions.length)],
+    specialties: participant.specialties || ["Mystery Skill"],
+    allergies: participant.allergies || ["None"],
+    dietaryRestrictions: participant.dietaryRestrictions || ["None"],
+    powerLevel: Math.floor(Math.random() * 5) + 1, 
+  });
 
   useEffect(() => {
-    fetchParticipants();
+    if (!lobbyId) return; 
+    setRoles([]);
+
+    // The first event carries everyone already in the lobby, then each new participant arrives as it joins
+    const events = new EventSource(`http://localhost:5000/lobby/${lobbyId}/events`);
+    events.addEventListener("participants", (event) => {
+      const participants = JSON.parse((event as MessageEvent).data);
+      setRoles((prev) => [...prev, ...participants.map(toRole)]);
+    });
+    events.addEventListener("participant", (event) => {
+      const participant = JSON.parse((event as MessageEvent).data);
+      setRoles((prev) => [...prev, toRole(participant)]);
+    });
+    events.onerror = (error) => {
+      console.error("Participant stream interrupted, reconnecting", error);
+    };
+
+    return () => events.close();
   }, [lobbyId]); 
 
   const nextSlide = () => {